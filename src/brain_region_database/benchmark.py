@@ -0,0 +1,149 @@
+import json
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.util import print_error_exit
+
+# Version of the benchmark results files, to increment when their structure changes.
+BENCHMARK_RESULTS_VERSION = 1
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Timings of the repetitions of a benchmark case, along with the number of rows it produced and the query plan of its
+    main query if it was requested.
+    """
+
+    name      : str
+    durations : list[float]
+    rows      : int | None
+    plan      : Any = None
+
+    @property
+    def min_duration(self) -> float:
+        return min(self.durations)
+
+    @property
+    def mean_duration(self) -> float:
+        return sum(self.durations) / len(self.durations)
+
+
+@dataclass
+class BenchmarkResults:
+    created     : str
+    scans_count : int | None
+    parameters  : dict[str, Any]
+    results     : list[BenchmarkResult] = field(default_factory=list)
+
+
+@dataclass
+class BenchmarkDifference:
+    name          : str
+    base_duration : float | None
+    new_duration  : float | None
+    base_rows     : int | None
+    new_rows      : int | None
+
+    @property
+    def change(self) -> float | None:
+        """
+        Relative change of the minimum duration, which is the least noisy measure of the repetitions.
+        """
+
+        if self.base_duration is None or self.new_duration is None or self.base_duration == 0:
+            return None
+
+        return self.new_duration / self.base_duration - 1
+
+
+def run_benchmark_case(name: str, function: Callable[[], int | None], repeat: int) -> BenchmarkResult:
+    """
+    Run a benchmark case several times, the function returns the number of rows produced by the case if relevant.
+    """
+
+    print(f"Running '{name}'...")
+
+    durations: list[float] = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = function()
+        durations.append(time.perf_counter() - start)
+
+    result = BenchmarkResult(name, durations, rows)
+    print(f"  {result.min_duration:.3f} s (min), {result.mean_duration:.3f} s (mean), {rows} rows")
+    return result
+
+
+def explain_query(db: Database, query: Select) -> Any:
+    """
+    Get the JSON plan of a query using `EXPLAIN ANALYZE`, which executes the query once more.
+    """
+
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    return db.connection().exec_driver_sql(
+        f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}',
+        compiled.params,  # type: ignore
+    ).scalar_one()
+
+
+def write_benchmark_results(results: BenchmarkResults, path: Path):
+    data = asdict(results)
+    data['version'] = BENCHMARK_RESULTS_VERSION
+    for result_data, result in zip(data['results'], results.results):
+        result_data['min_duration']  = result.min_duration
+        result_data['mean_duration'] = result.mean_duration
+
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=4)
+
+
+def read_benchmark_results(path: Path) -> BenchmarkResults:
+    if not path.exists():
+        return print_error_exit(f"File '{path}' not found.")
+
+    with open(path) as file:
+        data = json.load(file)
+
+    if data.get('version') != BENCHMARK_RESULTS_VERSION:
+        return print_error_exit(f"Unsupported benchmark results version in '{path}'.")
+
+    return BenchmarkResults(
+        created=data['created'],
+        scans_count=data['scans_count'],
+        parameters=data['parameters'],
+        results=[
+            BenchmarkResult(result['name'], result['durations'], result['rows'], result.get('plan'))
+            for result in data['results']
+        ],
+    )
+
+
+def diff_benchmark_results(base: BenchmarkResults, new: BenchmarkResults) -> list[BenchmarkDifference]:
+    """
+    Match the cases of two benchmark results by name, in the order of the base results followed by the new cases.
+    """
+
+    base_results = {result.name: result for result in base.results}
+    new_results  = {result.name: result for result in new.results}
+
+    differences: list[BenchmarkDifference] = []
+    for name in dict.fromkeys([*base_results, *new_results]):
+        base_result = base_results.get(name)
+        new_result  = new_results.get(name)
+        differences.append(BenchmarkDifference(
+            name=name,
+            base_duration=base_result.min_duration if base_result is not None else None,
+            new_duration=new_result.min_duration if new_result is not None else None,
+            base_rows=base_result.rows if base_result is not None else None,
+            new_rows=new_result.rows if new_result is not None else None,
+        ))
+
+    return differences
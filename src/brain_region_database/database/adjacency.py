@@ -0,0 +1,64 @@
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.geometries import read_postgis_3d_geometry_wkb
+from brain_region_database.database.models import DBScan, DBScanRegionAdjacency
+from brain_region_database.database.queries import delete_scan_region_adjacency, get_scan_region_lod_shapes_wkb
+from brain_region_database.process.intersection import (
+    BoundingVolumeHierarchy,
+    build_bounding_volume_hierarchy,
+    compute_surfaces_distance,
+    hierarchies_boxes_overlap,
+)
+
+# Default maximum distance up to which the distance between two regions is stored in the adjacency table.
+DEFAULT_ADJACENCY_MAX_DISTANCE = 5.0
+
+
+def build_region_hierarchies(shapes: list[bytes | memoryview]) -> list[BoundingVolumeHierarchy]:
+    """
+    Build the bounding volume hierarchies of region shapes encoded as WKB.
+    """
+
+    hierarchies: list[BoundingVolumeHierarchy] = []
+    for shape in shapes:
+        vertices, faces = read_postgis_3d_geometry_wkb(shape)
+        hierarchies.append(build_bounding_volume_hierarchy(vertices, faces))
+
+    return hierarchies
+
+
+def compute_scan_region_adjacency(
+    db: Database,
+    scan: DBScan,
+    lod_level: int | None,
+    max_distance: float = DEFAULT_ADJACENCY_MAX_DISTANCE,
+) -> list[DBScanRegionAdjacency]:
+    """
+    Compute the spatial relations of all the region pairs of a scan at a given level, and store them in the adjacency
+    table, replacing the relations previously computed for that scan and level.
+    """
+
+    shapes = get_scan_region_lod_shapes_wkb(db, scan, lod_level)
+    hierarchies = build_region_hierarchies([shape for _, _, shape in shapes])
+
+    adjacencies: list[DBScanRegionAdjacency] = []
+    for i, (region_a_id, _, _) in enumerate(shapes):
+        for j in range(i + 1, len(shapes)):
+            region_b_id, _, _ = shapes[j]
+            distance = compute_surfaces_distance(hierarchies[i], hierarchies[j], max_distance)
+            adjacencies.append(DBScanRegionAdjacency(
+                scan_id=scan.id,
+                region_a_id=region_a_id,
+                region_b_id=region_b_id,
+                level=lod_level,
+                box_2d_overlap=hierarchies_boxes_overlap(hierarchies[i], hierarchies[j], 2),
+                box_3d_overlap=hierarchies_boxes_overlap(hierarchies[i], hierarchies[j], 3),
+                intersects=distance == 0,
+                distance=distance if distance <= max_distance else None,
+                max_distance=max_distance,
+            ))
+
+    delete_scan_region_adjacency(db, scan, lod_level)
+    db.add_all(adjacencies)
+    db.flush()
+    return adjacencies
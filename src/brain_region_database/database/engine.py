@@ -3,10 +3,16 @@ import os
 from sqlalchemy import URL, Engine, create_engine
 from sqlalchemy.orm import Session
 
+from brain_region_database.database.monitor import instrument_engine
 from brain_region_database.util import read_environment_variable
 
 
-def get_engine() -> Engine:
+def get_engine(pool_size: int | None = None) -> Engine:
+    """
+    Create an engine connected to the database, whose connection pool keeps the given number of connections open if
+    provided, which is useful to share an engine between several threads.
+    """
+
     print("Connecting to the database...")
 
     url = URL.create(
@@ -20,7 +26,20 @@ def get_engine() -> Engine:
 
     debug_variable = os.environ.get('POSTGIS_DEBUG')
     echo = debug_variable == 'true' or debug_variable == '1'
-    return create_engine(url, echo=echo, plugins=['geoalchemy2'])
+    if pool_size is None:
+        engine = create_engine(url, echo=echo, plugins=['geoalchemy2'])
+    else:
+        engine = create_engine(
+            url,
+            echo=echo,
+            plugins=['geoalchemy2'],
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_pre_ping=True,
+        )
+
+    instrument_engine(engine)
+    return engine
 
 
 def get_engine_session() -> Session:
@@ -1,10 +1,26 @@
+import struct
+
+import numpy as np
+
 from brain_region_database.scan import Point3D
 
 type Vec3[T] = tuple[T, T, T]
-type Vec4[T] = tuple[T, T, T, T]
 
 type Vec3F = Vec3[float]
-type Vec4F = Vec3[float]
+
+# ISO WKB geometry types with a Z dimension, and the little endian byte order marker.
+WKB_LITTLE_ENDIAN        = 1
+WKB_POLYGON_Z            = 1003
+WKB_POLYHEDRAL_SURFACE_Z = 1015
+
+# WKB layout of a closed triangle with a single ring of four points.
+WKB_TRIANGLE_Z_DTYPE = np.dtype([
+    ('byte_order',   'u1'),
+    ('type',         '<u4'),
+    ('rings_count',  '<u4'),
+    ('points_count', '<u4'),
+    ('points',       '<f8', (4, 3)),
+])
 
 
 def create_point(centroid: Point3D) -> str:
@@ -24,34 +40,90 @@ def create_box(box: tuple[Point3D, Point3D]) -> str:
     )"""
 
 
-def create_postgis_3d_geometry(vertices: list[Vec3F], faces: list[Vec4[int]]) -> str:
-    return polygons_to_surface(close_polygons(get_mesh_polygons(vertices, faces)))
-
-
-def get_mesh_polygons(vertices: list[Vec3F], faces: list[Vec4[int]]) -> list[Vec3[Vec3F]]:
-    polygons: list[Vec3[Vec3F]] = []
-    for face in faces:
-        face_vertices = (vertices[face[0]], vertices[face[1]], vertices[face[2]])
-        polygons.append(face_vertices)
-
-    return polygons
-
-
-def close_polygons(polygons: list[Vec3[Vec3F]]) -> list[Vec4[Vec3F]]:
-    closed_polygons: list[Vec4[Vec3F]] = []
-    for polygon in polygons:
-        closed_polygons.append((polygon[0], polygon[1], polygon[2], polygon[0]))
-
-    return closed_polygons
-
-
-def polygons_to_surface(polygons: list[Vec4[Vec3F]]) -> str:
-    polygon_strings: list[str] = []
-    for polygon in polygons:
-        vertex_strings: list[str] = []
-        for vertex in polygon:
-            vertex_strings.append(" ".join(map(str, vertex)))
-
-        polygon_strings.append(f"(({", ".join(vertex_strings)}))")
-
-    return f"POLYHEDRALSURFACE Z ({", ".join(polygon_strings)})"
+def get_vertices_bounding_box(vertices: list[Vec3F] | np.ndarray) -> tuple[Point3D, Point3D]:
+    vertices_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    return Point3D.from_array(vertices_array.min(axis=0)), Point3D.from_array(vertices_array.max(axis=0))
+
+
+def create_postgis_3d_geometry_wkb(vertices: list[Vec3F] | np.ndarray, faces: list[Vec3[int]] | np.ndarray) -> bytes:
+    """
+    Encode a triangle mesh as the WKB of a polyhedral surface, writing all the faces at once from the vertex and face
+    arrays rather than formatting each coordinate as text.
+    """
+
+    vertices_array = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    faces_array    = np.asarray(faces, dtype=np.intp).reshape(-1, 3)
+
+    polygons = np.empty(len(faces_array), dtype=WKB_TRIANGLE_Z_DTYPE)
+    polygons['byte_order']   = WKB_LITTLE_ENDIAN
+    polygons['type']         = WKB_POLYGON_Z
+    polygons['rings_count']  = 1
+    polygons['points_count'] = 4
+    polygons['points']       = vertices_array[faces_array[:, [0, 1, 2, 0]]]
+
+    header = struct.pack('<BII', WKB_LITTLE_ENDIAN, WKB_POLYHEDRAL_SURFACE_Z, len(faces_array))
+    return header + polygons.tobytes()
+
+
+def read_postgis_3d_geometry_wkb(wkb: bytes | memoryview) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decode the little endian WKB of a polyhedral surface into an array of unique vertices and an array of triangle
+    faces. Surfaces made only of triangles are decoded at once as a NumPy buffer view, other polygons are decoded one
+    by one and fan triangulated.
+    """
+
+    byte_order, geometry_type, polygons_count = struct.unpack_from('<BII', wkb, 0)
+    if byte_order != WKB_LITTLE_ENDIAN or geometry_type != WKB_POLYHEDRAL_SURFACE_Z:
+        raise ValueError(f"Unsupported WKB geometry (byte order {byte_order}, type {geometry_type}).")
+
+    header_size = struct.calcsize('<BII')
+    if len(wkb) == header_size + polygons_count * WKB_TRIANGLE_Z_DTYPE.itemsize:
+        polygons = np.frombuffer(wkb, dtype=WKB_TRIANGLE_Z_DTYPE, offset=header_size)
+        if (
+            np.all(polygons['byte_order'] == WKB_LITTLE_ENDIAN)
+            and np.all(polygons['type'] == WKB_POLYGON_Z)
+            and np.all(polygons['rings_count'] == 1)
+            and np.all(polygons['points_count'] == 4)
+        ):
+            points = polygons['points'][:, :3].reshape(-1, 3)
+            vertices, indices = np.unique(points, axis=0, return_inverse=True)
+            return vertices, indices.reshape(-1, 3)
+
+    return read_polygons_wkb(wkb, header_size, polygons_count)
+
+
+def read_polygons_wkb(wkb: bytes | memoryview, offset: int, polygons_count: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decode the WKB polygons of a polyhedral surface one by one, using the exterior ring of each polygon.
+    """
+
+    points: list[np.ndarray] = []
+    faces:  list[Vec3[int]]  = []
+    points_offset = 0
+
+    for _ in range(polygons_count):
+        byte_order, geometry_type, rings_count = struct.unpack_from('<BII', wkb, offset)
+        if byte_order != WKB_LITTLE_ENDIAN or geometry_type != WKB_POLYGON_Z:
+            raise ValueError(f"Unsupported WKB polygon (byte order {byte_order}, type {geometry_type}).")
+
+        offset += struct.calcsize('<BII')
+        for ring in range(rings_count):
+            (points_count,) = struct.unpack_from('<I', wkb, offset)
+            offset += struct.calcsize('<I')
+            if ring == 0:
+                # Ignore the closing point of the ring.
+                ring_points = np.frombuffer(wkb, dtype='<f8', count=points_count * 3, offset=offset).reshape(-1, 3)
+                ring_points = ring_points[:-1]
+                points.append(ring_points)
+                for i in range(1, len(ring_points) - 1):
+                    faces.append((points_offset, points_offset + i, points_offset + i + 1))
+
+                points_offset += len(ring_points)
+
+            offset += points_count * 3 * 8
+
+    if points == []:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.intp)
+
+    vertices, indices = np.unique(np.concatenate(points), axis=0, return_inverse=True)
+    return vertices, indices.ravel()[np.array(faces, dtype=np.intp)]
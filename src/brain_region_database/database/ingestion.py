@@ -0,0 +1,162 @@
+from itertools import batched
+
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.adjacency import compute_scan_region_adjacency
+from brain_region_database.database.models import DBScan, DBScanRegion
+from brain_region_database.database.queries import (
+    delete_scan_region_adjacency,
+    get_scan_region_ids,
+    get_scan_region_lod_keys,
+    insert_scan,
+    insert_scan_region,
+    insert_scan_region_lod,
+    insert_scan_region_lods,
+    insert_scan_regions,
+    try_get_scan,
+    try_get_scan_region,
+    try_get_scan_region_lod,
+)
+from brain_region_database.database.region_catalog import RegionCatalog
+from brain_region_database.instrumentation import span
+from brain_region_database.scan import ScanRegion
+from brain_region_database.scan_file import ScanStream
+
+# Number of scan regions read from the file before inserting them in the database.
+DEFAULT_INSERT_BATCH_SIZE = 64
+
+
+def insert_scan_regions_one_by_one(
+    db: Database,
+    scan: DBScan,
+    regions_data: list[ScanRegion],
+    catalog: RegionCatalog,
+) -> list[int | None]:
+    """
+    Insert some scan regions and scan region LODs of a scan one by one, returning the levels of the inserted LODs.
+    """
+
+    regions = catalog.get_regions(regions_data)
+
+    scan_regions: list[DBScanRegion] = []
+    for region, region_data in zip(regions, regions_data):
+        scan_region = try_get_scan_region(db, scan, region)
+        if scan_region is not None:
+            print(f"Region '{scan_region.region.name}' already present in the database for that scan.")
+        else:
+            print("Inserting scan region into the database...")
+            scan_region = insert_scan_region(db, scan, region, region_data)
+            print(f"Successfully inserted scan region with ID: {scan_region.id}")
+
+        scan_regions.append(scan_region)
+
+    lod_levels: list[int | None] = []
+    for region, region_data in zip(regions, regions_data):
+        lod = try_get_scan_region_lod(db, scan, region, region_data.lod_level)
+        if lod is not None:
+            print(f"Region LOD '{lod.region.name}' ('{lod.level}') already present in the database for that scan.")
+        else:
+            print("Inserting scan region LOD into the database...")
+            lod = insert_scan_region_lod(db, scan, region, region_data)
+            print(f"Successfully inserted scan region LOD with ID: {lod.id}")
+            lod_levels.append(region_data.lod_level)
+
+    return lod_levels
+
+
+def insert_scan_regions_bulk(
+    db: Database,
+    scan: DBScan,
+    regions_data: list[ScanRegion],
+    catalog: RegionCatalog,
+) -> list[int | None]:
+    """
+    Insert some scan regions and scan region LODs of a scan using a single query to find the existing rows and a single
+    multi-row insert to add the missing rows of each table, returning the levels of the inserted LODs.
+    """
+
+    regions = catalog.get_regions(regions_data)
+
+    scan_region_ids = get_scan_region_ids(db, scan)
+    missing_scan_regions = [
+        (region, region_data) for region, region_data in zip(regions, regions_data)
+        if region.id not in scan_region_ids
+    ]
+
+    print(f"Inserting {len(missing_scan_regions)} scan regions into the database...")
+    insert_scan_regions(
+        db,
+        scan,
+        [region for region, _ in missing_scan_regions],
+        [region_data for _, region_data in missing_scan_regions],
+    )
+
+    lod_keys = get_scan_region_lod_keys(db, scan)
+    missing_lods = [
+        (region, region_data) for region, region_data in zip(regions, regions_data)
+        if (region.id, region_data.lod_level) not in lod_keys
+    ]
+
+    print(f"Inserting {len(missing_lods)} scan region LODs into the database...")
+    insert_scan_region_lods(
+        db,
+        scan,
+        [region for region, _ in missing_lods],
+        [region_data for _, region_data in missing_lods],
+    )
+
+    return [region_data.lod_level for _, region_data in missing_lods]
+
+
+def insert_scan_stream(
+    db: Database,
+    scan_stream: ScanStream,
+    catalog: RegionCatalog,
+    bulk: bool,
+    adjacency: bool,
+    batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+) -> DBScan:
+    """
+    Insert a scan in the database, inserting its regions by batches as they are read so that the whole scan is never
+    loaded in memory.
+    """
+
+    print(f"Loaded scan: {scan_stream.info.file_name}")
+
+    scan = try_get_scan(db, scan_stream.info.file_name)
+    if scan is not None:
+        print(f"Scan '{scan.file_name}' already present in the database.")
+    else:
+        print("Inserting scan into the database...")
+        scan = insert_scan(db, scan_stream.info)
+        print(f"Successfully inserted scan with ID: {scan.id}")
+
+    regions_count = 0
+    lod_levels:          dict[int | None, None] = {}
+    inserted_lod_levels: dict[int | None, None] = {}
+    for regions_data in batched(scan_stream.regions, batch_size):
+        with span('ingestion/regions'):
+            if bulk:
+                batch_lod_levels = insert_scan_regions_bulk(db, scan, list(regions_data), catalog)
+            else:
+                batch_lod_levels = insert_scan_regions_one_by_one(db, scan, list(regions_data), catalog)
+
+        regions_count += len(regions_data)
+        lod_levels.update(dict.fromkeys(region_data.lod_level for region_data in regions_data))
+        inserted_lod_levels.update(dict.fromkeys(batch_lod_levels))
+
+    print(f"Number of regions: {regions_count}")
+
+    if adjacency:
+        for lod_level in lod_levels:
+            print(f"Computing region adjacency for LOD level {lod_level}...")
+            with span('ingestion/adjacency'):
+                compute_scan_region_adjacency(db, scan, lod_level)
+    else:
+        # The region adjacency of the levels with new regions is incomplete, delete it so that it is not used.
+        for lod_level in inserted_lod_levels:
+            delete_scan_region_adjacency(db, scan, lod_level)
+
+    with span('ingestion/commit'):
+        db.commit()
+    return scan
@@ -28,7 +28,7 @@ class DBRegion(Base):
     __tablename__ = 'region'
 
     id          : Mapped[int] = mapped_column(init=False, primary_key=True, autoincrement=True)
-    name        : Mapped[str]
+    name        : Mapped[str] = mapped_column(index=True, unique=True)
     laterality  : Mapped[Laterality | None]
     atlas_value : Mapped[int]
 
@@ -55,8 +55,9 @@ class DBScanRegion(Base):
     max_intensity    : Mapped[float]
     median_intensity : Mapped[float]
 
-    # Geometric properties
-    centroid: Mapped[Geometry] = mapped_column(Geometry('POINTZ', srid=0, use_N_D_index=True))
+    # Geometric properties, the bounding box is in voxel space
+    centroid     : Mapped[Geometry] = mapped_column(Geometry('POINTZ', srid=0, use_N_D_index=True))
+    bounding_box : Mapped[Geometry] = mapped_column(Geometry('POLYHEDRALSURFACEZ', srid=0, use_N_D_index=True))
 
     # Relationships
     scan   : Mapped['DBScan']   = relationship(init=False, back_populates='regions')
@@ -79,9 +80,43 @@ class DBScanRegionLOD(Base):
     region_id : Mapped[int] = mapped_column(ForeignKey('region.id'), index=True)
     level     : Mapped[int | None]
 
-    # Geometric properties
-    shape: Mapped[Geometry] = mapped_column(Geometry('POLYHEDRALSURFACEZ', srid=0, use_N_D_index=True))
+    # Geometric properties, the bounding box is the envelope of the shape, which is much cheaper to compare
+    shape        : Mapped[Geometry] = mapped_column(Geometry('POLYHEDRALSURFACEZ', srid=0, use_N_D_index=True))
+    bounding_box : Mapped[Geometry] = mapped_column(Geometry('POLYHEDRALSURFACEZ', srid=0, use_N_D_index=True))
 
     # Relationships
     scan   : Mapped['DBScan']   = relationship(init=False)
     region : Mapped['DBRegion'] = relationship(init=False)
+
+
+class DBScanRegionAdjacency(Base):
+    __tablename__ = 'scan_region_adjacency'
+    __table_args__ = (
+        Index(
+            'idx_scan_region_adjacency_scan_id_level_region_a_id_region_b_id',
+            'scan_id',
+            'level',
+            'region_a_id',
+            'region_b_id',
+            unique=True,
+        ),
+    )
+
+    # Keys
+    id          : Mapped[int] = mapped_column(init=False, primary_key=True, autoincrement=True)
+    scan_id     : Mapped[int] = mapped_column(ForeignKey('scan.id'), index=True)
+    region_a_id : Mapped[int] = mapped_column(ForeignKey('region.id'))
+    region_b_id : Mapped[int] = mapped_column(ForeignKey('region.id'))
+    level       : Mapped[int | None]
+
+    # Precomputed spatial relations, the distance is only known up to the maximum distance
+    box_2d_overlap : Mapped[bool]
+    box_3d_overlap : Mapped[bool]
+    intersects     : Mapped[bool]
+    distance       : Mapped[float | None]
+    max_distance   : Mapped[float]
+
+    # Relationships
+    scan     : Mapped['DBScan']   = relationship(init=False)
+    region_a : Mapped['DBRegion'] = relationship(init=False, foreign_keys=[region_a_id])
+    region_b : Mapped['DBRegion'] = relationship(init=False, foreign_keys=[region_b_id])
@@ -1,9 +1,11 @@
 import time
 from typing import Any
 
-from sqlalchemy import event
+from sqlalchemy import Engine, event
 from sqlalchemy.orm import Session
 
+from brain_region_database.instrumentation import record_span
+
 
 class DatabaseMonitor:
     def __init__(self, session: Session):
@@ -15,3 +17,19 @@ class DatabaseMonitor:
         def after_execute(conn: Any, cursor: Any, statement: Any, params: Any, context: Any, executemany: Any):  # type: ignore
             elapsed = time.perf_counter() - context._timer_start
             print(f'Query: {elapsed * 1000:.2f} ms')
+
+
+def instrument_engine(engine: Engine):
+    """
+    Record a span for each SQL statement executed by an engine, named after the statement verb, if instrumentation is
+    enabled.
+    """
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn: Any, cursor: Any, statement: Any, params: Any, context: Any, executemany: Any):  # type: ignore
+        context._span_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn: Any, cursor: Any, statement: str, params: Any, context: Any, executemany: Any):  # type: ignore
+        verb = statement.split(None, 1)[0].lower() if statement.strip() != '' else 'unknown'
+        record_span(f'sql/{verb}', context._span_start, time.perf_counter() - context._span_start)
@@ -1,11 +1,23 @@
-from geoalchemy2.functions import ST_GeomFromEWKT
-from sqlalchemy import select
+from geoalchemy2.functions import ST_AsBinary, ST_GeomFromEWKT, ST_GeomFromWKB
+from sqlalchemy import Row, delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 from sqlalchemy.orm import Session as Database
 from sqlalchemy.sql.expression import func
 
-from brain_region_database.database.geometries import create_point, create_postgis_3d_geometry
-from brain_region_database.database.models import DBRegion, DBScan, DBScanRegion, DBScanRegionLOD
-from brain_region_database.scan import Scan, ScanRegion
+from brain_region_database.database.geometries import (
+    create_box,
+    create_point,
+    create_postgis_3d_geometry_wkb,
+    get_vertices_bounding_box,
+)
+from brain_region_database.database.models import (
+    DBRegion,
+    DBScan,
+    DBScanRegion,
+    DBScanRegionAdjacency,
+    DBScanRegionLOD,
+)
+from brain_region_database.scan import ScanInfo, ScanRegion
 
 
 def try_get_scan(db: Database, file_name: str) -> DBScan | None:
@@ -14,12 +26,6 @@ def try_get_scan(db: Database, file_name: str) -> DBScan | None:
     ).scalar_one_or_none()
 
 
-def try_get_region(db: Database, name: str) -> DBRegion | None:
-    return db.execute(select(DBRegion)
-        .where(DBRegion.name == name)
-    ).scalar_one_or_none()
-
-
 def try_get_scan_region(db: Database, scan: DBScan, region: DBRegion) -> DBScanRegion | None:
     return db.execute(select(DBScanRegion).where(
         DBScanRegion.scan   == scan,
@@ -46,6 +52,31 @@ def try_get_largest_scan_lod(db: Database, scan: DBScan) -> int | None:
     )).scalar_one_or_none()
 
 
+def get_scan_lod_levels(db: Database, scan: DBScan) -> list[int | None]:
+    return list(db.execute(select(DBScanRegionLOD.level)
+        .where(DBScanRegionLOD.scan == scan)
+        .distinct()
+    ).scalars().all())
+
+
+def try_get_scan_region_adjacency_max_distance(db: Database, scan: DBScan, lod_level: int | None) -> float | None:
+    """
+    Get the maximum distance up to which the region adjacency of a scan and level was computed, if it was computed.
+    """
+
+    return db.execute(select(func.min(DBScanRegionAdjacency.max_distance)).where(
+        DBScanRegionAdjacency.scan  == scan,
+        DBScanRegionAdjacency.level == lod_level,
+    )).scalar_one_or_none()
+
+
+def delete_scan_region_adjacency(db: Database, scan: DBScan, lod_level: int | None) -> None:
+    db.execute(delete(DBScanRegionAdjacency).where(
+        DBScanRegionAdjacency.scan_id == scan.id,
+        DBScanRegionAdjacency.level   == lod_level,
+    ))
+
+
 def get_scan_regions_lod_with_scan_and_level(
     db: Database,
     scan: DBScan,
@@ -60,7 +91,49 @@ def get_scan_regions_lod_with_scan_and_level(
     ).scalars().all())
 
 
-def insert_scan(db: Database, scan_data: Scan) -> DBScan:
+def get_scan_region_lod_shapes_wkb(
+    db: Database,
+    scan: DBScan,
+    lod_level: int | None,
+) -> list[Row[tuple[int, str, memoryview]]]:
+    """
+    Get the region ID, region name and shape as little endian WKB of the region LODs of a scan and level.
+    """
+
+    return list(db.execute(
+        select(DBRegion.id, DBRegion.name, ST_AsBinary(DBScanRegionLOD.shape, 'NDR').label('shape'))
+        .join(DBScanRegionLOD.region)
+        .where(
+            DBScanRegionLOD.scan == scan,
+            DBScanRegionLOD.level == lod_level,
+        )
+        .order_by(DBRegion.id)
+    ).all())  # type: ignore
+
+
+def get_regions(db: Database) -> list[DBRegion]:
+    return list(db.execute(select(DBRegion)).scalars().all())
+
+
+def get_regions_with_names(db: Database, names: list[str]) -> list[DBRegion]:
+    return list(db.execute(select(DBRegion)
+        .where(DBRegion.name.in_(names))
+    ).scalars().all())
+
+
+def get_scan_region_ids(db: Database, scan: DBScan) -> set[int]:
+    return set(db.execute(select(DBScanRegion.region_id)
+        .where(DBScanRegion.scan == scan)
+    ).scalars().all())
+
+
+def get_scan_region_lod_keys(db: Database, scan: DBScan) -> set[tuple[int, int | None]]:
+    return set(db.execute(select(DBScanRegionLOD.region_id, DBScanRegionLOD.level)  # type: ignore
+        .where(DBScanRegionLOD.scan == scan)
+    ).tuples().all())
+
+
+def insert_scan(db: Database, scan_data: ScanInfo) -> DBScan:
     scan = DBScan(
         file_name=scan_data.file_name,
         file_size=scan_data.file_size,
@@ -73,18 +146,6 @@ def insert_scan(db: Database, scan_data: Scan) -> DBScan:
     return scan
 
 
-def insert_region(db: Database, region_data: ScanRegion) -> DBRegion:
-    region = DBRegion(
-        name=region_data.name,
-        laterality=None,
-        atlas_value=region_data.value,
-    )
-
-    db.add(region)
-    db.flush()
-    return region
-
-
 def insert_scan_region(db: Database, scan: DBScan, region: DBRegion, region_data: ScanRegion) -> DBScanRegion:
     scan_region = DBScanRegion(
         scan_id=scan.id,
@@ -96,6 +157,7 @@ def insert_scan_region(db: Database, scan: DBScan, region: DBRegion, region_data
         max_intensity=region_data.max_intensity,
         median_intensity=region_data.median_intensity,
         centroid=ST_GeomFromEWKT(create_point(region_data.centroid), srid=0),
+        bounding_box=ST_GeomFromEWKT(create_box(region_data.bounding_box), srid=0),
     )
 
     db.add(scan_region)
@@ -108,9 +170,82 @@ def insert_scan_region_lod(db: Database, scan: DBScan, region: DBRegion, region_
         scan_id=scan.id,
         region_id=region.id,
         level=region_data.lod_level,
-        shape=ST_GeomFromEWKT(create_postgis_3d_geometry(region_data.shape[0], region_data.shape[1]), srid=0)
+        shape=ST_GeomFromWKB(create_postgis_3d_geometry_wkb(region_data.shape[0], region_data.shape[1]), 0),
+        bounding_box=ST_GeomFromEWKT(create_box(get_vertices_bounding_box(region_data.shape[0])), srid=0),
     )
 
     db.add(lod)
     db.flush()
     return lod
+
+
+def insert_regions(db: Database, regions_data: list[ScanRegion]) -> None:
+    """
+    Insert several regions using a multi-row insert, ignoring the regions whose name is already present in the
+    database, including those inserted concurrently by another transaction.
+    """
+
+    if regions_data == []:
+        return
+
+    db.execute(postgresql_insert(DBRegion).on_conflict_do_nothing(index_elements=['name']), [
+        {
+            'name': region_data.name,
+            'laterality': None,
+            'atlas_value': region_data.value,
+        } for region_data in regions_data
+    ])
+
+
+def insert_scan_regions(
+    db: Database,
+    scan: DBScan,
+    regions: list[DBRegion],
+    regions_data: list[ScanRegion],
+) -> None:
+    """
+    Insert several scan regions using multi-row inserts, ignoring the scan regions already present in the database.
+    """
+
+    if regions_data == []:
+        return
+
+    db.execute(postgresql_insert(DBScanRegion).on_conflict_do_nothing(index_elements=['scan_id', 'region_id']), [
+        {
+            'scan_id': scan.id,
+            'region_id': region.id,
+            'voxel_count': region_data.voxel_count,
+            'mean_intensity': region_data.mean_intensity,
+            'std_intensity': region_data.std_intensity,
+            'min_intensity': region_data.min_intensity,
+            'max_intensity': region_data.max_intensity,
+            'median_intensity': region_data.median_intensity,
+            'centroid': create_point(region_data.centroid),
+            'bounding_box': create_box(region_data.bounding_box),
+        } for region, region_data in zip(regions, regions_data)
+    ])
+
+
+def insert_scan_region_lods(
+    db: Database,
+    scan: DBScan,
+    regions: list[DBRegion],
+    regions_data: list[ScanRegion],
+) -> None:
+    """
+    Insert several scan region LODs using multi-row inserts, ignoring the scan region LODs already present in the
+    database.
+    """
+
+    if regions_data == []:
+        return
+
+    db.execute(postgresql_insert(DBScanRegionLOD).values([
+        {
+            'scan_id': scan.id,
+            'region_id': region.id,
+            'level': region_data.lod_level,
+            'shape': ST_GeomFromWKB(create_postgis_3d_geometry_wkb(region_data.shape[0], region_data.shape[1]), 0),
+            'bounding_box': ST_GeomFromEWKT(create_box(get_vertices_bounding_box(region_data.shape[0])), srid=0),
+        } for region, region_data in zip(regions, regions_data)
+    ]).on_conflict_do_nothing())
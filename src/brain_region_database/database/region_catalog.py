@@ -0,0 +1,68 @@
+from threading import Lock
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.models import DBRegion
+from brain_region_database.database.queries import get_regions, get_regions_with_names, insert_regions
+from brain_region_database.scan import ScanRegion
+
+
+class RegionCatalog:
+    """
+    In-memory cache of the region table, which is loaded once and then resolves the region names without querying the
+    database. The missing regions are inserted in their own transaction, which is committed immediately so that the
+    cached regions remain valid whatever happens to the transaction of the scan. The catalog can be shared between
+    threads.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.lock = Lock()
+        self.regions: dict[str, DBRegion] | None = None
+
+    def get_regions(self, regions_data: list[ScanRegion]) -> list[DBRegion]:
+        """
+        Get the regions of some scan regions, inserting the missing regions in a single multi-row insert. The returned
+        regions are detached from any session.
+        """
+
+        with self.lock:
+            if self.regions is None:
+                self.load()
+
+            assert self.regions is not None
+
+            missing_regions_data = {
+                region_data.name: region_data for region_data in regions_data if region_data.name not in self.regions
+            }
+
+        # Insert the missing regions outside of the lock so that the other threads are not blocked by the database. If
+        # several threads insert the same regions, the conflicting inserts are ignored and all threads read them back.
+        if missing_regions_data != {}:
+            self.insert(list(missing_regions_data.values()))
+
+        with self.lock:
+            assert self.regions is not None
+            return [self.regions[region_data.name] for region_data in regions_data]
+
+    def load(self):
+        print("Loading regions catalog...")
+        with Database(self.engine, expire_on_commit=False) as db:
+            self.regions = {region.name: region for region in get_regions(db)}
+
+        print(f"Loaded {len(self.regions)} regions.")
+
+    def insert(self, regions_data: list[ScanRegion]):
+        print(f"Inserting {len(regions_data)} regions into the database...")
+        with Database(self.engine, expire_on_commit=False) as db:
+            insert_regions(db, regions_data)
+            db.commit()
+
+            # The regions inserted concurrently by another transaction are also read back.
+            regions = get_regions_with_names(db, [region_data.name for region_data in regions_data])
+
+        with self.lock:
+            assert self.regions is not None
+            for region in regions:
+                self.regions[region.name] = region
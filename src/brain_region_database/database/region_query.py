@@ -0,0 +1,134 @@
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from geoalchemy2.functions import ST_X, ST_Y, ST_Z, ST_3DDWithin, ST_MakePoint
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.models import DBRegion, DBScan, DBScanRegion, Laterality
+from brain_region_database.scan import Point3D
+
+DEFAULT_REGION_QUERY_BATCH_SIZE = 1000
+
+
+@dataclass
+class RegionQuery:
+    """
+    Predicates on the scan regions of all the scans, the unset predicates are ignored. The spatial predicates apply to
+    the region centroids, which are in voxel space.
+    """
+
+    scan_file_names    : list[str] = field(default_factory=list)
+    region_names       : list[str] = field(default_factory=list)
+    laterality         : Laterality | None = None
+    box                : tuple[Point3D, Point3D] | None = None
+    sphere             : tuple[Point3D, float] | None = None
+    min_voxel_count    : int | None = None
+    max_voxel_count    : int | None = None
+    min_mean_intensity : float | None = None
+    max_mean_intensity : float | None = None
+
+
+@dataclass
+class RegionQueryResult:
+    scan_region_id   : int
+    scan_file_name   : str
+    region_name      : str
+    voxel_count      : int
+    mean_intensity   : float
+    median_intensity : float
+    centroid         : Point3D
+
+
+def build_region_query(query: RegionQuery, after_id: int | None = None, limit: int | None = None) -> Select:
+    """
+    Build the SQL query of a region query. The results are ordered by scan region ID so that they can be paged using
+    the ID of the last result of the previous page, which unlike an offset does not rescan the previous pages.
+    """
+
+    statement = (
+        select(
+            DBScanRegion.id.label('scan_region_id'),
+            DBScan.file_name.label('scan_file_name'),
+            DBRegion.name.label('region_name'),
+            DBScanRegion.voxel_count,
+            DBScanRegion.mean_intensity,
+            DBScanRegion.median_intensity,
+            ST_X(DBScanRegion.centroid).label('centroid_x'),
+            ST_Y(DBScanRegion.centroid).label('centroid_y'),
+            ST_Z(DBScanRegion.centroid).label('centroid_z'),
+        )
+        .select_from(DBScanRegion)
+        .join(DBScan, DBScanRegion.scan_id == DBScan.id)
+        .join(DBRegion, DBScanRegion.region_id == DBRegion.id)
+        .order_by(DBScanRegion.id)
+    )
+
+    if query.scan_file_names != []:
+        statement = statement.where(DBScan.file_name.in_(query.scan_file_names))
+
+    if query.region_names != []:
+        statement = statement.where(DBRegion.name.in_(query.region_names))
+
+    if query.laterality is not None:
+        statement = statement.where(DBRegion.laterality == query.laterality)
+
+    # Both spatial predicates are rewritten by PostGIS as bounding box comparisons that use the centroid N-D index.
+    if query.box is not None:
+        box_min, box_max = query.box
+        statement = statement.where(DBScanRegion.centroid.op('&&&')(func.ST_3DMakeBox(
+            ST_MakePoint(box_min.x, box_min.y, box_min.z),
+            ST_MakePoint(box_max.x, box_max.y, box_max.z),
+        )))
+
+    if query.sphere is not None:
+        center, radius = query.sphere
+        statement = statement.where(
+            ST_3DDWithin(DBScanRegion.centroid, ST_MakePoint(center.x, center.y, center.z), radius)
+        )
+
+    if query.min_voxel_count is not None:
+        statement = statement.where(DBScanRegion.voxel_count >= query.min_voxel_count)
+
+    if query.max_voxel_count is not None:
+        statement = statement.where(DBScanRegion.voxel_count <= query.max_voxel_count)
+
+    if query.min_mean_intensity is not None:
+        statement = statement.where(DBScanRegion.mean_intensity >= query.min_mean_intensity)
+
+    if query.max_mean_intensity is not None:
+        statement = statement.where(DBScanRegion.mean_intensity <= query.max_mean_intensity)
+
+    if after_id is not None:
+        statement = statement.where(DBScanRegion.id > after_id)
+
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    return statement
+
+
+def stream_region_query(
+    db: Database,
+    query: RegionQuery,
+    after_id: int | None = None,
+    limit: int | None = None,
+    batch_size: int = DEFAULT_REGION_QUERY_BATCH_SIZE,
+) -> Iterator[RegionQueryResult]:
+    """
+    Execute a region query and yield its results as they are read. The results are fetched in batches from a
+    server-side cursor, so that the whole result set is never loaded in memory at once.
+    """
+
+    statement = build_region_query(query, after_id, limit).execution_options(yield_per=batch_size)
+
+    for row in db.execute(statement):
+        yield RegionQueryResult(
+            scan_region_id=row.scan_region_id,
+            scan_file_name=row.scan_file_name,
+            region_name=row.region_name,
+            voxel_count=row.voxel_count,
+            mean_intensity=row.mean_intensity,
+            median_intensity=row.median_intensity,
+            centroid=Point3D(x=row.centroid_x, y=row.centroid_y, z=row.centroid_z),
+        )
@@ -0,0 +1,218 @@
+import argparse
+import cProfile
+import json
+import os
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+
+@dataclass
+class Span:
+    """
+    A timed stage of a run, the start is relative to the start of the recording.
+    """
+
+    name       : str
+    start      : float
+    duration   : float
+    process_id : int
+    thread_id  : int
+    bytes      : int | None
+
+
+@dataclass
+class SpanStatistics:
+    name  : str
+    count : int
+    total : float
+    p50   : float
+    p95   : float
+    bytes : int | None
+
+
+class SpanRecorder:
+    """
+    Thread-safe collector of the spans of a run. The spans of worker processes are not collected.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def record(self, name: str, start: float, duration: float, size: int | None = None):
+        span = Span(name, start - self.origin, duration, os.getpid(), threading.get_ident(), size)
+        with self.lock:
+            self.spans.append(span)
+
+    def get_statistics(self) -> list[SpanStatistics]:
+        """
+        Aggregate the spans by name, in the order of their first occurrence.
+        """
+
+        with self.lock:
+            spans = list(self.spans)
+
+        spans_by_name: dict[str, list[Span]] = {}
+        for span in spans:
+            spans_by_name.setdefault(span.name, []).append(span)
+
+        statistics: list[SpanStatistics] = []
+        for name, name_spans in spans_by_name.items():
+            durations = np.array([span.duration for span in name_spans])
+            spans_bytes = [span.bytes for span in name_spans if span.bytes is not None]
+            statistics.append(SpanStatistics(
+                name=name,
+                count=len(name_spans),
+                total=float(durations.sum()),
+                p50=float(np.percentile(durations, 50)),
+                p95=float(np.percentile(durations, 95)),
+                bytes=sum(spans_bytes) if spans_bytes != [] else None,
+            ))
+
+        return statistics
+
+    def print_statistics(self):
+        print("Timings:")
+        for statistics in self.get_statistics():
+            size = f", {statistics.bytes} bytes" if statistics.bytes is not None else ""
+            print(
+                f"- {statistics.name}: {statistics.count} calls, {statistics.total:.3f} s total,"
+                f" {statistics.p50 * 1000:.2f} ms p50, {statistics.p95 * 1000:.2f} ms p95{size}"
+            )
+
+    def write_json(self, path: Path):
+        """
+        Write the aggregated statistics and the spans of the run in a JSON file.
+        """
+
+        with self.lock:
+            spans = list(self.spans)
+
+        with open(path, 'w') as file:
+            json.dump({
+                'statistics': [statistics.__dict__ for statistics in self.get_statistics()],
+                'spans': [span.__dict__ for span in spans],
+            }, file, indent=4)
+
+    def write_chrome_trace(self, path: Path):
+        """
+        Write the spans of the run in the Chrome trace event format, which can be opened in Perfetto or
+        `chrome://tracing`.
+        """
+
+        with self.lock:
+            spans = list(self.spans)
+
+        with open(path, 'w') as file:
+            json.dump({
+                'traceEvents': [
+                    {
+                        'name': span.name,
+                        'cat': span.name.split('/')[0],
+                        'ph': 'X',
+                        'ts': span.start * 1_000_000,
+                        'dur': span.duration * 1_000_000,
+                        'pid': span.process_id,
+                        'tid': span.thread_id,
+                        'args': {'bytes': span.bytes} if span.bytes is not None else {},
+                    } for span in spans
+                ],
+                'displayTimeUnit': 'ms',
+            }, file)
+
+
+# Recorder of the current run, spans are only recorded if instrumentation is enabled.
+recorder: SpanRecorder | None = None
+
+
+def enable_instrumentation() -> SpanRecorder:
+    global recorder
+    recorder = SpanRecorder()
+    return recorder
+
+
+def disable_instrumentation():
+    global recorder
+    recorder = None
+
+
+def record_span(name: str, start: float, duration: float, size: int | None = None):
+    """
+    Record a span measured by the caller, such as a span whose start and end are in different callbacks.
+    """
+
+    if recorder is not None:
+        recorder.record(name, start, duration, size)
+
+
+@contextmanager
+def span(name: str, size: int | None = None) -> Generator[None]:
+    """
+    Time a stage of the run if instrumentation is enabled, the size is the number of bytes processed by the stage.
+    """
+
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, time.perf_counter() - start, size)
+
+
+def add_instrumentation_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--timings',
+        type=Path,
+        help="Record the duration of each stage and SQL statement, and write their statistics in a JSON file.")
+
+    parser.add_argument('--trace',
+        type=Path,
+        help="Record the duration of each stage and SQL statement, and write them in a Chrome trace file.")
+
+    parser.add_argument('--cprofile',
+        type=Path,
+        help="Profile the main thread using cProfile, and write the statistics in a file readable by 'pstats'.")
+
+
+@contextmanager
+def instrument_run(args: argparse.Namespace) -> Generator[None]:
+    """
+    Enable the instrumentation requested by the command line arguments for the duration of a run. The results are
+    written even if the run fails, so that a failing run can be analyzed.
+    """
+
+    run_recorder = enable_instrumentation() if args.timings is not None or args.trace is not None else None
+    profile = cProfile.Profile() if args.cprofile is not None else None
+
+    if profile is not None:
+        profile.enable()
+
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(args.cprofile)
+            print(f"Wrote profile to '{args.cprofile}'.")
+
+        if run_recorder is not None:
+            disable_instrumentation()
+            run_recorder.print_statistics()
+
+            if args.timings is not None:
+                run_recorder.write_json(args.timings)
+                print(f"Wrote timings to '{args.timings}'.")
+
+            if args.trace is not None:
+                run_recorder.write_chrome_trace(args.trace)
+                print(f"Wrote trace to '{args.trace}'.")
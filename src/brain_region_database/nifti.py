@@ -1,3 +1,4 @@
+import os
 import tempfile
 from pathlib import Path
 from typing import Any, Literal
@@ -29,6 +30,16 @@ def load_nifti_image(path: Path) -> NiftiImage:
     return image  # type: ignore
 
 
+def get_nifti_data(image: NiftiImage) -> np.ndarray:
+    """
+    Get the data of a NIfTI image in its stored data type rather than as a double precision copy like `get_fdata`.
+    The data of uncompressed files is memory-mapped, so that only the parts that are used are read. Images with a
+    scaling factor are still scaled, in which case the data is converted to the smallest adequate floating type.
+    """
+
+    return np.asanyarray(image.dataobj)
+
+
 def has_same_dims(image: NiftiImage, template: NiftiImage) -> bool:
     return np.allclose(image.affine, template.affine) and image.shape == template.shape  # type: ignore
 
@@ -62,13 +73,71 @@ def get_voxel_size(image: NiftiImage) -> str:
         return "1.00x1.00x1.00mm"
 
 
+# Conversion between the RAS coordinates of NIfTI and the LPS coordinates of ITK and ANTs.
+RAS_TO_LPS = np.diag([-1.0, -1.0, 1.0, 1.0])
+
+
 def ants_to_nib(image: ANTsImage) -> NiftiImage:
-    _, temp_path = tempfile.mkstemp(suffix='.nii')
-    ants.image_write(image, temp_path)  # type: ignore
-    return load_nifti_image(Path(temp_path))
+    """
+    Convert an ANTs image to a NIfTI image in memory, or through a temporary file for the images that cannot be
+    converted directly.
+    """
+
+    if image.dimension != 3 or image.has_components:  # type: ignore
+        return ants_to_nib_file(image)
+
+    direction = np.asarray(image.direction, dtype=np.float64)  # type: ignore
+    spacing   = np.asarray(image.spacing, dtype=np.float64)  # type: ignore
+    origin    = np.asarray(image.origin, dtype=np.float64)  # type: ignore
+
+    affine = np.eye(4)
+    affine[:3, :3] = direction * spacing
+    affine[:3, 3]  = origin
+    affine = RAS_TO_LPS @ affine
+
+    nifti = Nifti1Image(image.numpy(), affine)  # type: ignore
+    nifti.set_qform(affine, code=1)
+    nifti.set_sform(affine, code=1)
+    return nifti
 
 
 def nib_to_ants(image: NiftiImage) -> ANTsImage:
-    _, temp_path = tempfile.mkstemp(suffix='.nii')
-    nib.save(image, temp_path)  # type: ignore
-    return ants.image_read(temp_path)  # type: ignore
+    """
+    Convert a NIfTI image to an ANTs image in memory, or through a temporary file for the images that cannot be
+    converted directly. Like the ANTs image reader, the data is converted to single precision.
+    """
+
+    if len(image.shape) != 3:  # type: ignore
+        return nib_to_ants_file(image)
+
+    affine  = RAS_TO_LPS @ image.affine  # type: ignore
+    spacing = np.linalg.norm(affine[:3, :3], axis=0)
+
+    return ants.from_numpy(  # type: ignore
+        np.asarray(image.dataobj, dtype=np.float32),
+        origin=affine[:3, 3].tolist(),
+        spacing=spacing.tolist(),
+        direction=affine[:3, :3] / spacing,
+    )
+
+
+def ants_to_nib_file(image: ANTsImage) -> NiftiImage:
+    file, temp_path = tempfile.mkstemp(suffix='.nii')
+    os.close(file)
+    try:
+        ants.image_write(image, temp_path)  # type: ignore
+        nifti = load_nifti_image(Path(temp_path))
+        # Read the data before deleting the file since nibabel loads it lazily.
+        return type(nifti)(np.asarray(nifti.dataobj), nifti.affine, nifti.header)
+    finally:
+        os.remove(temp_path)
+
+
+def nib_to_ants_file(image: NiftiImage) -> ANTsImage:
+    file, temp_path = tempfile.mkstemp(suffix='.nii')
+    os.close(file)
+    try:
+        nib.save(image, temp_path)  # type: ignore
+        return ants.image_read(temp_path)  # type: ignore
+    finally:
+        os.remove(temp_path)
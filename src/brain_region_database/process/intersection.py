@@ -0,0 +1,385 @@
+from dataclasses import dataclass
+from itertools import pairwise
+
+import numpy as np
+
+# Distance under which two surfaces are considered to intersect, to absorb floating point errors on touching surfaces.
+INTERSECTION_TOLERANCE = 1e-9
+
+# Maximum number of triangles in a leaf of a bounding volume hierarchy.
+BVH_LEAF_SIZE = 16
+
+# Number of triangle pairs tested at once, to bound the memory used by the vectorized tests.
+TRIANGLE_PAIRS_CHUNK_SIZE = 1 << 16
+
+# Number of node pairs traversed at once, to bound the memory used by the traversal of the hierarchies.
+NODE_PAIRS_CHUNK_SIZE = 1 << 12
+
+
+@dataclass
+class BoundingVolumeHierarchy:
+    """
+    Bounding volume hierarchy of the triangles of a mesh. The nodes are stored as arrays, the root node is the node 0,
+    leaf nodes have no children (-1) and contain the triangles in the range `starts:ends` of the triangles array.
+    """
+
+    triangles: np.ndarray
+    boxes_min: np.ndarray
+    boxes_max: np.ndarray
+    children: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+
+def build_bounding_volume_hierarchy(vertices: np.ndarray, faces: np.ndarray) -> BoundingVolumeHierarchy:
+    """
+    Build the bounding volume hierarchy of a triangle mesh by recursively splitting the triangles at the median of
+    their centroids along the longest axis of the node.
+    """
+
+    triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(faces, dtype=np.intp).reshape(-1, 3)]
+    triangles_min = triangles.min(axis=1)
+    triangles_max = triangles.max(axis=1)
+    centroids     = triangles.mean(axis=1)
+
+    order = np.arange(len(triangles))
+
+    boxes_min: list[np.ndarray] = []
+    boxes_max: list[np.ndarray] = []
+    children:  list[list[int]]  = []
+    starts:    list[int]        = []
+    ends:      list[int]        = []
+
+    # Stack of the nodes to build, described by their index and triangles range.
+    stack = [(0, 0, len(triangles))]
+    boxes_min.append(np.zeros(3))
+    boxes_max.append(np.zeros(3))
+    children.append([-1, -1])
+    starts.append(0)
+    ends.append(len(triangles))
+
+    while stack != []:
+        node, start, end = stack.pop()
+        node_triangles = order[start:end]
+
+        if len(node_triangles) > 0:
+            boxes_min[node] = triangles_min[node_triangles].min(axis=0)
+            boxes_max[node] = triangles_max[node_triangles].max(axis=0)
+
+        if len(node_triangles) <= BVH_LEAF_SIZE:
+            continue
+
+        node_centroids = centroids[node_triangles]
+        axis = np.argmax(node_centroids.max(axis=0) - node_centroids.min(axis=0))
+        middle = len(node_triangles) // 2
+        order[start:end] = node_triangles[np.argpartition(node_centroids[:, axis], middle)]
+
+        for child_start, child_end in ((start, start + middle), (start + middle, end)):
+            child = len(children)
+            boxes_min.append(np.zeros(3))
+            boxes_max.append(np.zeros(3))
+            children.append([-1, -1])
+            starts.append(child_start)
+            ends.append(child_end)
+            children[node][0 if child_start == start else 1] = child
+            stack.append((child, child_start, child_end))
+
+    return BoundingVolumeHierarchy(
+        triangles=triangles[order],
+        boxes_min=np.array(boxes_min),
+        boxes_max=np.array(boxes_max),
+        children=np.array(children, dtype=np.intp),
+        starts=np.array(starts, dtype=np.intp),
+        ends=np.array(ends, dtype=np.intp),
+    )
+
+
+def boxes_distance(
+    a_min: np.ndarray,
+    a_max: np.ndarray,
+    b_min: np.ndarray,
+    b_max: np.ndarray,
+) -> np.ndarray:
+    """
+    Compute the distances between pairs of axis-aligned boxes, which is zero for overlapping boxes.
+    """
+
+    gaps = np.maximum(np.maximum(a_min - b_max, b_min - a_max), 0)
+    return np.sqrt(np.sum(gaps * gaps, axis=-1))
+
+
+def hierarchies_boxes_overlap(a: BoundingVolumeHierarchy, b: BoundingVolumeHierarchy, axes: int = 3) -> bool:
+    """
+    Check whether the root bounding boxes of two hierarchies overlap on their first axes, which is like the '&&'
+    operator of PostGIS for two axes and the '&&&' operator for three axes.
+    """
+
+    return bool(
+        np.all(a.boxes_min[0, :axes] <= b.boxes_max[0, :axes])
+        and np.all(b.boxes_min[0, :axes] <= a.boxes_max[0, :axes])
+    )
+
+
+def compute_surfaces_distance(
+    a: BoundingVolumeHierarchy,
+    b: BoundingVolumeHierarchy,
+    max_distance: float,
+    threshold: float = 0.0,
+) -> float:
+    """
+    Compute the minimum distance between two triangle surfaces, which is zero if they intersect, or infinity if they
+    are further than the maximum distance from each other. The computation stops as soon as a distance within the
+    threshold is found, in which case that distance is only an upper bound of the minimum distance.
+
+    Both hierarchies are traversed depth-first, the node pairs further than the best distance found so far are pruned,
+    and the triangle pairs of the close leaf pairs are tested in batches as soon as they are reached.
+    """
+
+    # Best distance found so far, or the maximum distance if no distance was found yet.
+    cutoff = max_distance
+    distance = np.inf
+
+    stack = [(np.zeros(1, dtype=np.intp), np.zeros(1, dtype=np.intp))]
+    while stack != []:
+        nodes_a, nodes_b = stack.pop()
+        distances = boxes_distance(
+            a.boxes_min[nodes_a],
+            a.boxes_max[nodes_a],
+            b.boxes_min[nodes_b],
+            b.boxes_max[nodes_b],
+        )
+
+        close     = distances <= cutoff
+        nodes_a   = nodes_a[close]
+        nodes_b   = nodes_b[close]
+        distances = distances[close]
+
+        # Split large sets of node pairs into chunks, the chunk of the closest node pairs being traversed first.
+        if len(nodes_a) > NODE_PAIRS_CHUNK_SIZE:
+            order = np.argsort(distances, kind='stable')[::-1]
+            for chunk in np.array_split(order, -(-len(order) // NODE_PAIRS_CHUNK_SIZE)):
+                stack.append((nodes_a[chunk], nodes_b[chunk]))
+
+            continue
+
+        leaf_a = a.children[nodes_a, 0] < 0
+        leaf_b = b.children[nodes_b, 0] < 0
+        leaves = leaf_a & leaf_b
+
+        # Test the closest leaf pairs first to shrink the cutoff as early as possible.
+        order = np.argsort(distances[leaves], kind='stable')
+        leaves_a = nodes_a[leaves][order]
+        leaves_b = nodes_b[leaves][order]
+        leaves_distances = distances[leaves][order]
+
+        for start, end in get_leaf_pair_batches(a, b, leaves_a, leaves_b):
+            batch = leaves_distances[start:end] <= cutoff
+            if not batch.any():
+                break
+
+            triangles_a, triangles_b = expand_leaf_pairs(a, b, leaves_a[start:end][batch], leaves_b[start:end][batch])
+            batch_distance = np.min(triangles_distance(a.triangles[triangles_a], b.triangles[triangles_b])).item()
+            distance = min(distance, batch_distance)
+            if distance <= INTERSECTION_TOLERANCE:
+                return 0.0
+
+            if distance <= threshold:
+                return distance
+
+            cutoff = min(cutoff, distance)
+
+        # Split the node with the most triangles, unless it is a leaf.
+        size_a  = a.ends[nodes_a] - a.starts[nodes_a]
+        size_b  = b.ends[nodes_b] - b.starts[nodes_b]
+        split_a = ~leaf_a & (leaf_b | (size_a >= size_b))
+        split_b = ~leaves & ~split_a
+
+        if not split_a.any() and not split_b.any():
+            continue
+
+        stack.append((
+            np.concatenate([
+                a.children[nodes_a[split_a], 0],
+                a.children[nodes_a[split_a], 1],
+                nodes_a[split_b],
+                nodes_a[split_b],
+            ]),
+            np.concatenate([
+                nodes_b[split_a],
+                nodes_b[split_a],
+                b.children[nodes_b[split_b], 0],
+                b.children[nodes_b[split_b], 1],
+            ]),
+        ))
+
+    return distance if distance <= max_distance else np.inf
+
+
+def get_leaf_pair_batches(
+    a: BoundingVolumeHierarchy,
+    b: BoundingVolumeHierarchy,
+    leaves_a: np.ndarray,
+    leaves_b: np.ndarray,
+) -> list[tuple[int, int]]:
+    """
+    Split consecutive pairs of leaves into ranges of about `TRIANGLE_PAIRS_CHUNK_SIZE` triangle pairs.
+    """
+
+    counts  = (a.ends[leaves_a] - a.starts[leaves_a]) * (b.ends[leaves_b] - b.starts[leaves_b])
+    batches = np.cumsum(counts) // TRIANGLE_PAIRS_CHUNK_SIZE
+    bounds  = [0, *(np.flatnonzero(np.diff(batches)) + 1).tolist(), len(counts)]
+    return [(start, end) for start, end in pairwise(bounds) if start < end]
+
+
+def expand_leaf_pairs(
+    a: BoundingVolumeHierarchy,
+    b: BoundingVolumeHierarchy,
+    leaves_a: np.ndarray,
+    leaves_b: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expand pairs of leaves into the pairs of all their triangles.
+    """
+
+    counts_a = a.ends[leaves_a] - a.starts[leaves_a]
+    counts_b = b.ends[leaves_b] - b.starts[leaves_b]
+    counts   = counts_a * counts_b
+
+    # Index of each triangle pair within its leaf pair.
+    pair_leaves  = np.repeat(np.arange(len(counts)), counts)
+    pair_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    triangles_a = a.starts[leaves_a][pair_leaves] + pair_offsets // counts_b[pair_leaves]
+    triangles_b = b.starts[leaves_b][pair_leaves] + pair_offsets % counts_b[pair_leaves]
+    return triangles_a, triangles_b
+
+
+def triangles_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Compute the distances between pairs of triangles of shape (N, 3, 3). The distance is zero if an edge of a triangle
+    crosses the other triangle, otherwise it is the minimum of the vertex-triangle and edge-edge distances.
+    """
+
+    distances = np.full(len(a), np.inf)
+
+    for i in range(3):
+        distances = np.minimum(distances, point_triangle_distance(a[:, i], b[:, 0], b[:, 1], b[:, 2]))
+        distances = np.minimum(distances, point_triangle_distance(b[:, i], a[:, 0], a[:, 1], a[:, 2]))
+
+    crossing = np.zeros(len(a), dtype=bool)
+    for i in range(3):
+        edge_a = (a[:, i], a[:, (i + 1) % 3])
+        edge_b = (b[:, i], b[:, (i + 1) % 3])
+        crossing |= segment_triangle_intersects(*edge_a, b[:, 0], b[:, 1], b[:, 2])
+        crossing |= segment_triangle_intersects(*edge_b, a[:, 0], a[:, 1], a[:, 2])
+        for j in range(3):
+            distances = np.minimum(distances, segment_segment_distance(*edge_a, b[:, j], b[:, (j + 1) % 3]))
+
+    distances[crossing] = 0
+    return distances
+
+
+def dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.einsum('ij,ij->i', a, b)
+
+
+def point_segment_distance(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Compute the distances between pairs of points and segments.
+    """
+
+    ab = b - a
+    lengths = dot(ab, ab)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(lengths > 0, dot(p - a, ab) / lengths, 0)
+
+    closest = a + np.clip(t, 0, 1)[:, None] * ab
+    return np.linalg.norm(p - closest, axis=1)
+
+
+def point_triangle_distance(p: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Compute the distances between pairs of points and triangles, as the distance to the triangle plane if the point
+    projects inside the triangle, or the distance to the closest edge otherwise.
+    """
+
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    normals = np.cross(ab, ac)
+    areas   = dot(normals, normals)
+
+    # Barycentric coordinates of the projection of the point on the triangle plane.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        v = dot(np.cross(ap, ac), normals) / areas
+        w = dot(np.cross(ab, ap), normals) / areas
+        plane_distances = np.abs(dot(ap, normals)) / np.sqrt(areas)
+
+    inside = (areas > 0) & (v >= 0) & (w >= 0) & (v + w <= 1)
+
+    edge_distances = np.minimum(
+        np.minimum(point_segment_distance(p, a, b), point_segment_distance(p, b, c)),
+        point_segment_distance(p, c, a),
+    )
+
+    return np.where(inside, plane_distances, edge_distances)
+
+
+def segment_segment_distance(p1: np.ndarray, q1: np.ndarray, p2: np.ndarray, q2: np.ndarray) -> np.ndarray:
+    """
+    Compute the distances between pairs of segments, following the closest points computation of Ericson's
+    "Real-Time Collision Detection".
+    """
+
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r  = p1 - p2
+    a  = dot(d1, d1)
+    e  = dot(d2, d2)
+    f  = dot(d2, r)
+    c  = dot(d1, r)
+    b  = dot(d1, d2)
+    denominator = a * e - b * b
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Closest point on the first segment for non-parallel segments, or its start for parallel segments.
+        s = np.where(denominator > 0, np.clip((b * f - c * e) / denominator, 0, 1), 0)
+        s = np.where(e > 0, s, np.where(a > 0, np.clip(-c / a, 0, 1), 0))
+        t = np.where(e > 0, (b * s + f) / e, 0)
+
+        # Clamp the closest point on the second segment and recompute the one on the first segment.
+        s = np.where(t < 0, np.where(a > 0, np.clip(-c / a, 0, 1), 0), s)
+        s = np.where(t > 1, np.where(a > 0, np.clip((b - c) / a, 0, 1), 0), s)
+        t = np.clip(t, 0, 1)
+
+    closest_1 = p1 + s[:, None] * d1
+    closest_2 = p2 + t[:, None] * d2
+    return np.linalg.norm(closest_1 - closest_2, axis=1)
+
+
+def segment_triangle_intersects(
+    p: np.ndarray,
+    q: np.ndarray,
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+) -> np.ndarray:
+    """
+    Check whether pairs of segments cross non-coplanar triangles, using the Möller-Trumbore algorithm.
+    """
+
+    direction = q - p
+    ab = b - a
+    ac = c - a
+    h = np.cross(direction, ac)
+    determinant = dot(ab, h)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inverse = 1 / determinant
+        s = p - a
+        u = inverse * dot(s, h)
+        k = np.cross(s, ab)
+        v = inverse * dot(direction, k)
+        t = inverse * dot(ac, k)
+
+        return (determinant != 0) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
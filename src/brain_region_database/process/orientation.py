@@ -1,11 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from nibabel.nifti1 import Nifti1Image
 from scipy.ndimage import map_coordinates  # type: ignore
 
-from brain_region_database.nifti import Interpolation, NiftiImage
+from brain_region_database.nifti import Interpolation, NiftiImage, get_nifti_data
+
+# Number of reference voxels resampled at once, which bounds the size of the coordinate arrays.
+REORIENTATION_SLAB_VOXELS = 1 << 22
+
 
+def reorient_nifti(
+    image: NiftiImage,
+    reference: NiftiImage,
+    interpolation: Interpolation,
+    workers: int = 1,
+) -> NiftiImage:
+    """
+    Resample an image in the voxel grid of a reference image. The reference grid is processed by slabs along its first
+    axis, whose coordinates are computed from the affine matrices when needed, so that the memory used in addition to
+    the input and output volumes does not depend on the size of the images. The slabs can be resampled by several
+    threads.
+    """
 
-def reorient_nifti(image: NiftiImage, reference: NiftiImage, interpolation: Interpolation) -> NiftiImage:
     match interpolation:
         case 'nearest':
             order = 0
@@ -15,30 +32,59 @@ def reorient_nifti(image: NiftiImage, reference: NiftiImage, interpolation: Inte
     # Get the affine matrices and data
     image_affine     = image.affine  # type: ignore
     reference_affine = reference.affine  # type: ignore
-    image_data = image.get_fdata()
+    image_data = get_nifti_data(image)
 
     # Get reference image shape
-    reference_shape = reference.shape
+    reference_shape = reference.shape[:3]
 
-    # Create coordinate grid in reference space
-    i, j, k = np.mgrid[:reference_shape[0], :reference_shape[1], :reference_shape[2]]
+    # Transform from the reference voxel coordinates to the moving image voxel coordinates
+    transform = np.linalg.inv(image_affine) @ reference_affine  # type: ignore
 
-    # Convert reference coordinates to world coordinates
-    world_coords = np.dot(reference_affine, np.vstack([i.ravel(), j.ravel(), k.ravel(), np.ones(i.size)]))  # type: ignore
+    reoriented_data = np.zeros(reference_shape, dtype=np.float64)
 
-    # Convert world coordinates to moving image coordinates
-    moving_coords = np.dot(np.linalg.inv(image_affine), world_coords)  # type: ignore
+    slab_size = max(1, REORIENTATION_SLAB_VOXELS // max(1, reference_shape[1] * reference_shape[2]))
+    slabs = [(start, min(start + slab_size, reference_shape[0])) for start in range(0, reference_shape[0], slab_size)]
 
-    # Extract the physical coordinates (remove homogeneous coordinate)
-    moving_coords_physical = moving_coords[:3]
+    def reorient_slab(slab: tuple[int, int]):
+        start, end = slab
+        map_coordinates(  # type: ignore
+            image_data,
+            get_slab_coordinates(transform, reference_shape, start, end),
+            output=reoriented_data[start:end],
+            order=order,
+            mode='constant',
+            cval=0.0,
+        )
 
-    # Reshape for interpolation
-    coords_array = moving_coords_physical.reshape(3, *reference_shape)
-
-    # Apply interpolation
-    reoriented_data = map_coordinates(image_data, coords_array, order=order, mode='constant', cval=0.0)  # type: ignore
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(reorient_slab, slabs))
+    else:
+        for slab in slabs:
+            reorient_slab(slab)
 
     # Create a new NIfTI image with the reoriented data and reference affine
     reoriented_img = Nifti1Image(reoriented_data, reference_affine, header=reference.header)  # type: ignore
 
     return reoriented_img
+
+
+def get_slab_coordinates(
+    transform: np.ndarray,
+    reference_shape: tuple[int, ...],
+    start: int,
+    end: int,
+) -> np.ndarray:
+    """
+    Get the moving image voxel coordinates of the reference voxels of a slab, as an array of shape (3, *slab_shape).
+    """
+
+    i = np.arange(start, end, dtype=np.float64)[:, None, None]
+    j = np.arange(reference_shape[1], dtype=np.float64)[None, :, None]
+    k = np.arange(reference_shape[2], dtype=np.float64)[None, None, :]
+
+    coordinates = np.empty((3, end - start, reference_shape[1], reference_shape[2]), dtype=np.float64)
+    for axis, (i_scale, j_scale, k_scale, offset) in enumerate(transform[:3]):
+        coordinates[axis] = i_scale * i + j_scale * j + k_scale * k + offset
+
+    return coordinates
@@ -1,21 +1,120 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
 import ants  # type: ignore
+import numpy as np
 from ants import ANTsImage  # type: ignore
 
+from brain_region_database.instrumentation import span
 from brain_region_database.nifti import Interpolation  # type: ignore
 
+REGISTRATION_TRANSFORM = 'SyN'
+
+# Version of the registration cache entries, to increment when their content or key changes.
+REGISTRATION_CACHE_VERSION = 1
+
+
+def register_nifti(
+    image: ANTsImage,
+    reference: ANTsImage,
+    interpolation: Interpolation,
+    cache_dir: Path | None = None,
+) -> ANTsImage:
+    """
+    Register an image on a reference image. If a cache directory is provided, the forward transforms are read from or
+    written to that cache, so that an image is only registered once on a given reference.
+    """
 
-def register_nifti(image: ANTsImage, reference: ANTsImage, interpolation: Interpolation) -> ANTsImage:
     match interpolation:
         case 'continuous':
             interpolator = 'linear'
         case 'nearest':
             interpolator = 'nearestNeighbor'
 
-    registration = ants.registration(fixed=reference, moving=image, type_of_transform='SyN')  # type: ignore
+    with span('registration/transforms'):
+        if cache_dir is not None:
+            transforms = get_cached_registration_transforms(image, reference, cache_dir)
+        else:
+            transforms = compute_registration_transforms(image, reference)
+
+    with span('registration/apply'):
+        return ants.apply_transforms(  # type: ignore
+            fixed=reference,
+            moving=image,
+            transformlist=transforms,  # type: ignore
+            interpolator=interpolator,
+        )
+
+
+def compute_registration_transforms(image: ANTsImage, reference: ANTsImage) -> list[str]:
+    registration = ants.registration(fixed=reference, moving=image, type_of_transform=REGISTRATION_TRANSFORM)  # type: ignore
+    return registration['fwdtransforms']  # type: ignore
+
+
+def get_cached_registration_transforms(image: ANTsImage, reference: ANTsImage, cache_dir: Path) -> list[str]:
+    """
+    Get the forward transforms of the registration of an image on a reference image from the cache, computing and
+    caching them if they are not present. The cache entries are keyed by the content of both images.
+    """
+
+    entry_dir = cache_dir / get_registration_key(image, reference)
+    manifest_path = entry_dir / 'transforms.json'
+    if manifest_path.exists():
+        print(f"Using cached registration '{entry_dir}'.")
+        with open(manifest_path) as manifest_file:
+            return [str(entry_dir / name) for name in json.load(manifest_file)]
+
+    print("Computing registration...")
+    transforms = compute_registration_transforms(image, reference)
+
+    # Write the entry in a temporary directory that is then renamed, so that a concurrent or interrupted run never
+    # sees an incomplete entry.
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    temp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-'))
+    names: list[str] = []
+    for i, transform in enumerate(transforms):
+        name = f'{i}_{Path(transform).name}'
+        shutil.copyfile(transform, temp_dir / name)
+        names.append(name)
+
+    with open(temp_dir / 'transforms.json', 'w') as manifest_file:
+        json.dump(names, manifest_file)
+
+    try:
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        # Another run cached the same registration in the meantime.
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return transforms
+
+    print(f"Cached registration in '{entry_dir}'.")
+    return [str(entry_dir / name) for name in names]
+
+
+def get_registration_key(image: ANTsImage, reference: ANTsImage) -> str:
+    """
+    Get the cache key of a registration, which is a hash of the content and geometry of both images and of the
+    registration parameters.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(f'{REGISTRATION_CACHE_VERSION}:{REGISTRATION_TRANSFORM}'.encode())
+    for ants_image in (image, reference):
+        data: np.ndarray = ants_image.numpy()  # type: ignore
+        digest.update(f'{data.dtype}:{data.shape}'.encode())
+        for metadata in (ants_image.spacing, ants_image.origin, ants_image.direction):  # type: ignore
+            digest.update(np.asarray(metadata, dtype=np.float64).tobytes())
+
+        digest.update(np.ascontiguousarray(data).tobytes())
+
+    return digest.hexdigest()
+
 
-    return ants.apply_transforms(  # type: ignore
-        fixed=reference,
-        moving=image,
-        transformlist=registration['fwdtransforms'],  # type: ignore
-        interpolator=interpolator,
-    )
+def get_default_registration_cache_dir() -> Path:
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    cache_dir = Path(cache_home) if cache_home else Path.home() / '.cache'
+    return cache_dir / 'brain_region_database' / 'registrations'
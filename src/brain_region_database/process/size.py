@@ -2,11 +2,11 @@ import numpy as np
 from nibabel.nifti1 import Nifti1Image
 from skimage.transform import resize  # type: ignore
 
-from brain_region_database.nifti import Interpolation, NiftiImage
+from brain_region_database.nifti import Interpolation, NiftiImage, get_nifti_data
 
 
 def resize_nifti(image: NiftiImage, reference: NiftiImage, interpolation: Interpolation) -> NiftiImage:
-    moving_data     = image.get_fdata()
+    moving_data     = get_nifti_data(image)
     reference_shape = reference.shape[:3]
 
     match interpolation:
@@ -22,7 +22,8 @@ def resize_nifti(image: NiftiImage, reference: NiftiImage, interpolation: Interp
         order=order,
         mode='constant',
         cval=0,
-        anti_aliasing=True
+        anti_aliasing=True,
+        preserve_range=True,
     )
 
     # Adjust affine for new voxel sizes
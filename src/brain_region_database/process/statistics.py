@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class RegionStatistics:
+    voxel_count: int
+    mean_intensity: float
+    std_intensity: float
+    min_intensity: float
+    max_intensity: float
+    median_intensity: float
+    centroid: np.ndarray
+    bounding_box: tuple[np.ndarray, np.ndarray]
+
+
+def compute_regions_statistics(
+    atlas_data: np.ndarray,
+    scan_data: np.ndarray,
+    values: list[int],
+) -> list[RegionStatistics]:
+    """
+    Compute the statistics of all the atlas regions in a single sort of the labelled voxels, rather than scanning the
+    whole volume once per region. The statistics are returned in the order of the given region values.
+    """
+
+    regions_count = len(values)
+
+    # Map every voxel to the index of its region in the values list, or discard it if it is not labelled.
+    values_array  = np.asarray(values)
+    values_sorter = np.argsort(values_array)
+    sorted_values = values_array[values_sorter]
+
+    # Flatten the volumes in their memory order if possible, as NIfTI data is usually in Fortran order, so that
+    # memory-mapped volumes are not copied.
+    memory_order = 'F' if atlas_data.flags.f_contiguous and scan_data.flags.f_contiguous else 'C'
+
+    labels    = atlas_data.ravel(memory_order)
+    positions = np.searchsorted(sorted_values, labels).clip(max=regions_count - 1)
+    voxels    = np.flatnonzero(sorted_values[positions] == labels)
+
+    # Only the intensities of the labelled voxels are converted to floats.
+    region_indices = values_sorter[positions[voxels]]
+    intensities    = scan_data.ravel(memory_order)[voxels].astype(np.float64)
+
+    # Sort the voxels by region, then by intensity, so that each region is a contiguous sorted group.
+    order = np.lexsort((intensities, region_indices))
+    region_indices = region_indices[order]
+    intensities    = intensities[order]
+    voxels         = voxels[order]
+
+    counts = np.bincount(region_indices, minlength=regions_count)
+    ends   = np.cumsum(counts)
+    starts = ends - counts
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(region_indices, weights=intensities, minlength=regions_count) / counts
+        deviations = (intensities - means[region_indices]) ** 2
+        stds = np.sqrt(np.bincount(region_indices, weights=deviations, minlength=regions_count) / counts)
+
+        coordinates = np.unravel_index(voxels, atlas_data.shape, order=memory_order)
+        centroids = np.stack([
+            np.bincount(region_indices, weights=axis_coordinates, minlength=regions_count) / counts
+            for axis_coordinates in coordinates
+        ], axis=1)
+
+    # Only the non-empty groups can be reduced, empty regions keep undefined statistics.
+    present = np.flatnonzero(counts)
+    present_starts = starts[present]
+    present_ends   = ends[present]
+
+    mins    = np.full(regions_count, np.nan)
+    maxs    = np.full(regions_count, np.nan)
+    medians = np.full(regions_count, np.nan)
+    mins[present] = intensities[present_starts]
+    maxs[present] = intensities[present_ends - 1]
+    medians[present] = (
+        intensities[present_starts + (counts[present] - 1) // 2] + intensities[present_starts + counts[present] // 2]
+    ) / 2
+
+    boxes_min = np.zeros((regions_count, 3), dtype=int)
+    boxes_max = np.zeros((regions_count, 3), dtype=int)
+    if len(present) > 0:
+        for axis, axis_coordinates in enumerate(coordinates):
+            boxes_min[present, axis] = np.minimum.reduceat(axis_coordinates, present_starts)
+            boxes_max[present, axis] = np.maximum.reduceat(axis_coordinates, present_starts)
+
+    return [
+        RegionStatistics(
+            voxel_count=counts[i].item(),
+            mean_intensity=means[i].item(),
+            std_intensity=stds[i].item(),
+            min_intensity=mins[i].item(),
+            max_intensity=maxs[i].item(),
+            median_intensity=medians[i].item(),
+            centroid=centroids[i],
+            bounding_box=(boxes_min[i], boxes_max[i]),
+        )
+        for i in range(regions_count)
+    ]
@@ -3,35 +3,47 @@ import trimesh
 import trimesh.repair
 from skimage import measure
 
-from brain_region_database.nifti import NiftiImage, Zooms
+from brain_region_database.instrumentation import span
+from brain_region_database.nifti import Zooms
 
 
-def compute_nifti_mask_mesh(
-    original: NiftiImage,
+def compute_mask_meshes(
     data: np.ndarray,
-    faces_limit: int | None = None,
-) -> tuple[np.ndarray, np.ndarray]:
+    zooms: Zooms,
+    affine: np.ndarray,
+    faces_limits: list[int | None],
+) -> list[tuple[np.ndarray, np.ndarray]]:
     """
-    Compte the 3D mesh of a NIfTI mask, simplifying according to the given parameters if desired.
+    Compute the 3D meshes of a mask at several levels of detail, where `None` is the native level of detail. Each level
+    is simplified from the previous finer level rather than from the marching cubes surface, which is much cheaper.
+    The meshes are returned in the order of the given face limits.
     """
 
-    header = original.header
-    zooms  = header.get_zooms()  # type: ignore
-
     print("  Computing region mesh...")
-    verts, faces = extract_surface_marching_cubes(data, zooms, original.affine)  # type: ignore
+    with span('mesh/marching_cubes', data.nbytes):
+        verts, faces = extract_surface_marching_cubes(data, zooms, affine)
 
     print(f"  Region has {len(faces)} faces")
     print("  Cleaning mesh...")
-    verts, faces = clean_mesh(verts, faces)
-
-    if faces_limit is not None and len(faces) > faces_limit:
-        print(f"  Simplifying region mesh to {faces_limit} faces...")
-        verts, faces = simplify_mesh(verts, faces, faces_limit)
-        print("  Cleaning mesh...")
+    with span('mesh/clean'):
         verts, faces = clean_mesh(verts, faces)
 
-    return verts, faces
+    meshes: dict[int | None, tuple[np.ndarray, np.ndarray]] = {}
+
+    # Process the levels from the finest to the coarsest, the native level being the finest.
+    for faces_limit in sorted(set(faces_limits), key=lambda limit: limit or float('inf'), reverse=True):
+        if faces_limit is not None and len(faces) > faces_limit:
+            print(f"  Simplifying region mesh to {faces_limit} faces...")
+            with span('mesh/simplify'):
+                verts, faces = simplify_mesh(verts, faces, faces_limit)
+
+            print("  Cleaning mesh...")
+            with span('mesh/clean'):
+                verts, faces = clean_mesh(verts, faces)
+
+        meshes[faces_limit] = (verts, faces)
+
+    return [meshes[faces_limit] for faces_limit in faces_limits]
 
 
 def extract_surface_marching_cubes(
@@ -41,21 +53,68 @@ def extract_surface_marching_cubes(
     level: float = 0.5
 ) -> tuple[np.ndarray, np.ndarray]:
     """
-    Extract surface using marching cubes with proper coordinate transformation.
+    Extract surface using marching cubes with proper coordinate transformation. Marching cubes only runs on the padded
+    bounding box of the mask, in the single precision it uses internally to avoid any full-volume float copy.
     """
 
+    slices = get_bounding_box_slices(get_mask_bounding_box(mask), mask.shape)
+
     verts, faces, _, _ = measure.marching_cubes(  # type: ignore
-        mask.astype(float),
+        np.ascontiguousarray(mask[slices], dtype=np.float32),
         level=level,
         spacing=zooms,
         allow_degenerate=False
     )
 
-    verts = apply_affine_transform(verts, affine)  # type: ignore
+    verts = apply_affine_transform(verts, translate_affine(affine, zooms, tuple(s.start for s in slices)))  # type: ignore
 
     return verts, faces  # type: ignore
 
 
+def get_mask_bounding_box(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the minimum and maximum voxel coordinates of a mask, or the whole volume if the mask is empty.
+    """
+
+    box_min = np.zeros(3, dtype=int)
+    box_max = np.array(mask.shape[:3]) - 1
+    for axis in range(3):
+        indices = np.flatnonzero(np.any(mask, axis=tuple(other for other in range(3) if other != axis)))
+        if len(indices) > 0:
+            box_min[axis] = indices[0]
+            box_max[axis] = indices[-1]
+
+    return box_min, box_max
+
+
+def get_bounding_box_slices(
+    bounding_box: tuple[np.ndarray, np.ndarray],
+    shape: tuple[int, ...],
+    padding: int = 1,
+) -> tuple[slice, slice, slice]:
+    """
+    Get the slices of the sub-volume that contains a voxel bounding box, padded so that marching cubes can close the
+    surface, and clipped to the volume shape.
+    """
+
+    box_min, box_max = bounding_box
+    return tuple(
+        slice(max(int(box_min[axis]) - padding, 0), min(int(box_max[axis]) + padding + 1, shape[axis]))
+        for axis in range(3)
+    )  # type: ignore
+
+
+def translate_affine(affine: np.ndarray, zooms: Zooms, offset: tuple[int, int, int]) -> np.ndarray:
+    """
+    Get the affine transform of a sub-volume starting at the given voxel offset. The offset is scaled by the zooms
+    since marching cubes vertices are expressed in spacing units before the affine is applied.
+    """
+
+    translated = affine.copy()
+    translated[:3, 3] += affine[:3, :3] @ (np.array(offset) * np.array(zooms[:3]))
+    return translated
+
+
 def apply_affine_transform(vertices: np.ndarray, affine: np.ndarray) -> np.ndarray:
     """
     Apply NIfTI affine transform to convert voxel coordinates to world coordinates.
@@ -1,5 +1,60 @@
+from typing import Annotated, Any
+
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, PlainSerializer, PlainValidator, field_validator
+
+
+def validate_vertices_array(value: Any) -> np.ndarray:
+    """
+    Validate an array of 3D vertices. Floating arrays are kept as is, possibly as views of a larger buffer, other values
+    are converted to double precision.
+    """
+
+    array = np.asarray(value)
+    if not np.issubdtype(array.dtype, np.floating):
+        if array.size != 0 and not np.issubdtype(array.dtype, np.number):
+            raise ValueError(f"Vertices must be numbers, got '{array.dtype}'.")
+
+        array = array.astype(np.float64)
+
+    if array.size == 0:
+        array = array.reshape(0, 3)
+
+    if array.ndim != 2 or array.shape[1] != 3:
+        raise ValueError(f"Vertices must be an array of shape (n, 3), got {array.shape}.")
+
+    return array
+
+
+def validate_faces_array(value: Any) -> np.ndarray:
+    """
+    Validate an array of triangle faces. Integer arrays are kept as is, empty arrays are converted to integers.
+    """
+
+    array = np.asarray(value)
+    if array.size == 0:
+        array = array.astype(np.int64).reshape(0, 3)
+
+    if not np.issubdtype(array.dtype, np.integer):
+        raise ValueError(f"Faces must be integers, got '{array.dtype}'.")
+
+    if array.ndim != 2 or array.shape[1] != 3:
+        raise ValueError(f"Faces must be an array of shape (n, 3), got {array.shape}.")
+
+    return array
+
+
+type VerticesArray = Annotated[
+    np.ndarray,
+    PlainValidator(validate_vertices_array),
+    PlainSerializer(lambda array: array.tolist(), when_used='json'),
+]
+
+type FacesArray = Annotated[
+    np.ndarray,
+    PlainValidator(validate_faces_array),
+    PlainSerializer(lambda array: array.tolist(), when_used='json'),
+]
 
 
 class Point3D(BaseModel):
@@ -28,12 +83,24 @@ class ScanRegion(BaseModel):
     centroid: Point3D
     bounding_box: tuple[Point3D, Point3D]
     lod_level: int | None
-    shape: tuple[list[tuple[float, float, float]], list[tuple[int, int, int]]]
+    shape: tuple[VerticesArray, FacesArray]
+
+    @field_validator('shape')
+    @classmethod
+    def validate_shape(cls, shape: tuple[np.ndarray, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        vertices, faces = shape
+        if len(faces) != 0 and (faces.min() < 0 or faces.max() >= len(vertices)):
+            raise ValueError("Faces must only reference existing vertices.")
+
+        return shape
 
 
-class Scan(BaseModel):
+class ScanInfo(BaseModel):
     file_name: str
     file_size: int
     dimensions: str
     voxel_size: str
+
+
+class Scan(ScanInfo):
     regions: list[ScanRegion]
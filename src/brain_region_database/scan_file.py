@@ -0,0 +1,338 @@
+import json
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+
+import numpy as np
+
+from brain_region_database.instrumentation import record_span, span
+from brain_region_database.scan import Scan, ScanInfo, ScanRegion
+
+# The binary scan file starts with a fixed size preamble, followed by a JSON header that contains the scan and regions
+# information except for the region shapes. The region shapes are stored after the header as raw little-endian float32
+# vertex and int32 face arrays, each aligned so that they can be viewed directly from a memory mapping of the file.
+SCAN_BINARY_MAGIC     = b'BRDBSCAN'
+SCAN_BINARY_VERSION   = 1
+SCAN_BINARY_PREAMBLE  = struct.Struct('<8sIIQ')
+SCAN_BINARY_ALIGNMENT = 64
+
+SCAN_BINARY_VERTEX_DTYPE = np.dtype('<f4')
+SCAN_BINARY_FACE_DTYPE   = np.dtype('<i4')
+
+# Minimum number of characters read at once when streaming a JSON scan file.
+SCAN_JSON_CHUNK_SIZE = 1 << 20
+
+
+class ScanFileError(ValueError):
+    """
+    Error raised when a scan file cannot be read, such as a missing file or an invalid file content.
+    """
+
+
+@dataclass
+class ScanStream:
+    """
+    A scan whose regions are read lazily. The regions must be consumed before reading the next scan of the same file.
+    """
+
+    info    : ScanInfo
+    regions : Iterator[ScanRegion]
+
+
+def read_scan_file(path: Path | None) -> Scan:
+    """
+    Read a JSON or binary scan file, or the standard input if no path is provided. The format is detected from the
+    first bytes of the file.
+    """
+
+    if path is None:
+        data = sys.stdin.buffer.read()
+        with span('scan_file/read', len(data)):
+            if data.startswith(SCAN_BINARY_MAGIC):
+                return read_scan_binary(np.frombuffer(data, dtype=np.uint8))
+
+            return read_scan_json_bytes(data)
+
+    if not path.exists():
+        raise ScanFileError(f"File '{path}' not found.")
+
+    with open(path, 'rb') as file:
+        is_binary = file.read(len(SCAN_BINARY_MAGIC)) == SCAN_BINARY_MAGIC
+
+    with span('scan_file/read', path.stat().st_size):
+        if is_binary:
+            return read_scan_binary(np.memmap(path, dtype=np.uint8, mode='r'))
+
+        with open(path) as file:
+            return read_scan_json(file)
+
+
+def stream_scan_file(path: Path | None) -> Iterator[ScanStream]:
+    """
+    Stream the scans of a JSON or binary scan file, or the standard input if no path is provided. JSON files can
+    contain several newline-delimited scans, which are parsed incrementally so that only one region is kept in memory
+    at a time.
+    """
+
+    if path is None:
+        if sys.stdin.buffer.peek(len(SCAN_BINARY_MAGIC)).startswith(SCAN_BINARY_MAGIC):
+            yield stream_scan(read_scan_binary(np.frombuffer(sys.stdin.buffer.read(), dtype=np.uint8)))
+        else:
+            yield from stream_scan_json(sys.stdin)
+
+        return
+
+    if not path.exists():
+        raise ScanFileError(f"File '{path}' not found.")
+
+    with open(path, 'rb') as file:
+        is_binary = file.read(len(SCAN_BINARY_MAGIC)) == SCAN_BINARY_MAGIC
+
+    if is_binary:
+        yield stream_scan(read_scan_binary(np.memmap(path, dtype=np.uint8, mode='r')))
+        return
+
+    with open(path) as file:
+        yield from stream_scan_json(file)
+
+
+def stream_scan(scan: Scan) -> ScanStream:
+    return ScanStream(ScanInfo(**scan.model_dump(exclude={'regions'})), iter(scan.regions))
+
+
+def stream_scan_json(text: TextIO) -> Iterator[ScanStream]:
+    """
+    Stream the scans of a sequence of JSON scan objects, such as newline-delimited JSON. The scan information must
+    precede the scan regions, which is the case of the files written by `write_scan_json`.
+    """
+
+    reader = JsonStreamReader(text)
+    while reader.peek() is not None:
+        print("Loading scan data...")
+        reader.expect('{')
+        info: dict[str, Any] = {}
+        while True:
+            key = reader.read_value()
+            reader.expect(':')
+            if key == 'regions':
+                break
+
+            info[key] = reader.read_value()
+            if reader.peek() == '}':
+                raise ScanFileError("No regions found in the scan JSON.")
+
+            reader.expect(',')
+
+        regions = stream_scan_json_regions(reader)
+        yield ScanStream(ScanInfo(**info), regions)
+
+        # Skip the regions that were not consumed to read the next scan.
+        for _ in regions:
+            pass
+
+
+def stream_scan_json_regions(reader: 'JsonStreamReader') -> Iterator[ScanRegion]:
+    """
+    Stream the regions array of a scan JSON object, and then read the end of that object.
+    """
+
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.expect(']')
+    else:
+        while True:
+            yield ScanRegion(**reader.read_value())
+            if reader.peek() == ']':
+                reader.expect(']')
+                break
+
+            reader.expect(',')
+
+    # Skip the keys that follow the regions, if any.
+    while reader.peek() == ',':
+        reader.expect(',')
+        reader.read_value()
+        reader.expect(':')
+        reader.read_value()
+
+    reader.expect('}')
+
+
+class JsonStreamReader:
+    """
+    Incremental reader of a stream of JSON values, which only keeps the value being read in memory.
+    """
+
+    def __init__(self, text: TextIO):
+        self.text     = text
+        self.buffer   = ''
+        self.position = 0
+        self.eof      = False
+        self.decoder  = json.JSONDecoder()
+
+    def read_more(self) -> bool:
+        """
+        Read more characters into the buffer, dropping the characters already consumed. The read size grows with the
+        buffer so that large values are decoded in linear time.
+        """
+
+        if self.eof:
+            return False
+
+        chunk = self.text.read(max(SCAN_JSON_CHUNK_SIZE, len(self.buffer) - self.position))
+        if chunk == '':
+            self.eof = True
+            return False
+
+        self.buffer   = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str | None:
+        """
+        Skip the whitespaces and return the next character without consuming it, or `None` at the end of the stream.
+        """
+
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self.read_more():
+                return None
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ScanFileError(f"Expected '{char}' in the JSON stream.")
+
+        self.position += 1
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A value that ends the buffer may be a truncated number, in which case it must be read again.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise ScanFileError(f"Invalid JSON stream: {error}")
+
+            self.read_more()
+
+
+def read_scan_json(text: TextIO) -> Scan:
+    print("Loading scan data...")
+    try:
+        scan_data = json.load(text)
+    except json.JSONDecodeError as error:
+        raise ScanFileError(f"Invalid scan JSON: {error}") from error
+
+    return Scan(**scan_data)
+
+
+def read_scan_json_bytes(data: bytes) -> Scan:
+    print("Loading scan data...")
+    try:
+        scan_data = json.loads(data)
+    except json.JSONDecodeError as error:
+        raise ScanFileError(f"Invalid scan JSON: {error}") from error
+
+    return Scan(**scan_data)
+
+
+def write_scan_json(scan: Scan, text: TextIO):
+    start = time.perf_counter()
+    data = json.dumps(scan.model_dump(mode='json'), indent=4)
+    text.write(data)
+    record_span('scan_file/write', start, time.perf_counter() - start, len(data))
+
+
+def read_scan_binary(buffer: np.ndarray) -> Scan:
+    """
+    Read a binary scan file from a byte array, which is usually a memory mapping of the file. The region shape arrays
+    are read-only views of that byte array, so no copy of the shapes is made.
+    """
+
+    print("Loading scan data...")
+
+    magic, version, _, header_size = SCAN_BINARY_PREAMBLE.unpack(buffer[:SCAN_BINARY_PREAMBLE.size].tobytes())
+    if magic != SCAN_BINARY_MAGIC:
+        raise ScanFileError("Invalid binary scan file.")
+
+    if version != SCAN_BINARY_VERSION:
+        raise ScanFileError(f"Unsupported binary scan file version {version}.")
+
+    header_start = SCAN_BINARY_PREAMBLE.size
+    header = json.loads(buffer[header_start:header_start + header_size].tobytes())
+    data_start = align_binary_offset(header_start + header_size)
+
+    regions: list[ScanRegion] = []
+    for region_header in header['regions']:
+        vertices_offset, vertices_count = region_header.pop('vertices')
+        faces_offset, faces_count = region_header.pop('faces')
+
+        vertices = read_binary_array(buffer, SCAN_BINARY_VERTEX_DTYPE, data_start + vertices_offset, vertices_count)
+        faces    = read_binary_array(buffer, SCAN_BINARY_FACE_DTYPE, data_start + faces_offset, faces_count)
+
+        regions.append(ScanRegion(**region_header, shape=(vertices, faces)))
+
+    return Scan(**header['scan'], regions=regions)
+
+
+def write_scan_binary(scan: Scan, file: BinaryIO):
+    """
+    Write a scan in the binary scan file format.
+    """
+
+    start = time.perf_counter()
+
+    # The array offsets are relative to the data section, which starts at the first aligned offset after the header.
+    arrays: list[np.ndarray] = []
+    regions_header: list[dict[str, Any]] = []
+    data_size = 0
+    for region in scan.regions:
+        vertices = np.asarray(region.shape[0], dtype=SCAN_BINARY_VERTEX_DTYPE).reshape(-1, 3)
+        faces    = np.asarray(region.shape[1], dtype=SCAN_BINARY_FACE_DTYPE).reshape(-1, 3)
+
+        region_header = region.model_dump(exclude={'shape'})
+        region_header['vertices'] = [data_size, len(vertices)]
+        data_size = align_binary_offset(data_size + vertices.nbytes)
+        region_header['faces'] = [data_size, len(faces)]
+        data_size = align_binary_offset(data_size + faces.nbytes)
+
+        arrays.extend((vertices, faces))
+        regions_header.append(region_header)
+
+    header = json.dumps({
+        'scan': scan.model_dump(exclude={'regions'}),
+        'regions': regions_header,
+    }).encode()
+
+    data_start = align_binary_offset(SCAN_BINARY_PREAMBLE.size + len(header))
+
+    file.write(SCAN_BINARY_PREAMBLE.pack(SCAN_BINARY_MAGIC, SCAN_BINARY_VERSION, 0, len(header)))
+    file.write(header)
+    file.write(b'\0' * (data_start - SCAN_BINARY_PREAMBLE.size - len(header)))
+
+    for array in arrays:
+        file.write(array.tobytes())
+        file.write(b'\0' * (align_binary_offset(array.nbytes) - array.nbytes))
+
+    record_span('scan_file/write', start, time.perf_counter() - start, data_start + data_size)
+
+
+def read_binary_array(buffer: np.ndarray, dtype: np.dtype, offset: int, count: int) -> np.ndarray:
+    return buffer[offset:offset + count * 3 * dtype.itemsize].view(dtype).reshape(count, 3)
+
+
+def align_binary_offset(offset: int) -> int:
+    return -(-offset // SCAN_BINARY_ALIGNMENT) * SCAN_BINARY_ALIGNMENT
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+
+import argparse
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Literal
+
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.atlas import load_atlas_dictionary
+from brain_region_database.benchmark import (
+    BenchmarkResults,
+    diff_benchmark_results,
+    explain_query,
+    read_benchmark_results,
+    run_benchmark_case,
+    write_benchmark_results,
+)
+from brain_region_database.database.engine import get_engine
+from brain_region_database.database.ingestion import insert_scan_stream
+from brain_region_database.database.models import DBScan
+from brain_region_database.database.queries import (
+    get_scan_lod_levels,
+    try_get_scan,
+    try_get_scan_region_adjacency_max_distance,
+)
+from brain_region_database.database.region_catalog import RegionCatalog
+from brain_region_database.database.region_query import RegionQuery, build_region_query, stream_region_query
+from brain_region_database.nifti import NiftiImage, ants_to_nib, get_nifti_data, load_nifti_image, nib_to_ants
+from brain_region_database.process.registration import register_nifti
+from brain_region_database.process.statistics import compute_regions_statistics
+from brain_region_database.scan_file import ScanFileError, read_scan_file, stream_scan
+from brain_region_database.scripts.extract_scan_regions import compute_regions_meshes, parse_lod_levels
+from brain_region_database.scripts.find_intersecting_regions import (
+    Box,
+    build_intersecting_regions_postgis_query,
+    find_intersecting_regions_adjacency,
+    find_intersecting_regions_local,
+    find_intersecting_regions_postgis,
+)
+from brain_region_database.util import print_error_exit, print_warning
+
+type QueryMode = Literal['none', 'intersect', 'distance']
+
+
+def run_extraction_benchmarks(args: argparse.Namespace, results: BenchmarkResults):
+    """
+    Benchmark the stages of the extraction of the regions of a scan, without the registration cache.
+    """
+
+    atlas_dictionary = load_atlas_dictionary(args.atlas_dictionary)
+    atlas_image      = load_nifti_image(args.atlas_image)
+    scan_image       = load_nifti_image(args.scan_image)
+
+    registered_images: list[NiftiImage] = []
+
+    def register() -> None:
+        registered_image = register_nifti(nib_to_ants(atlas_image), nib_to_ants(scan_image), 'nearest')
+        registered_images.append(ants_to_nib(registered_image))
+
+    results.results.append(run_benchmark_case('extract/registration', register, args.repeat))
+
+    registered_image = registered_images[-1]
+    atlas_data = get_nifti_data(registered_image)
+    scan_data  = get_nifti_data(scan_image)
+    values = [region.value for region in atlas_dictionary.regions]
+
+    def compute_statistics() -> int:
+        return len(compute_regions_statistics(atlas_data, scan_data, values))
+
+    results.results.append(run_benchmark_case('extract/statistics', compute_statistics, args.repeat))
+
+    regions_statistics = compute_regions_statistics(atlas_data, scan_data, values)
+    lod_levels = args.lod if args.lod is not None else [None]
+
+    def compute_meshes() -> int:
+        meshes = compute_regions_meshes(
+            registered_image,
+            atlas_dictionary.regions,
+            regions_statistics,
+            atlas_data,
+            lod_levels,
+            args.workers,
+        )
+
+        return sum(len(region_meshes) for region_meshes in meshes)
+
+    lods = ','.join(format_lod_level(lod_level) for lod_level in lod_levels)
+    results.results.append(run_benchmark_case(f'extract/meshes/lod={lods}', compute_meshes, args.repeat))
+
+
+def run_insert_benchmarks(engine: Engine, args: argparse.Namespace, results: BenchmarkResults):
+    """
+    Benchmark the insertion of a scan file. Each insertion is rolled back so that the database is left unchanged.
+    """
+
+    try:
+        scan = read_scan_file(args.insert)
+    except ScanFileError as error:
+        return print_error_exit(str(error))
+
+    scan = scan.model_copy(update={'file_name': f'benchmark_{scan.file_name}'})
+
+    # Load the regions catalog beforehand so that only the insertion of the scan is measured.
+    catalog = RegionCatalog(engine)
+    catalog.get_regions(scan.regions)
+
+    def insert() -> int:
+        with engine.connect() as connection:
+            transaction = connection.begin()
+            with Database(bind=connection, join_transaction_mode='create_savepoint') as db:
+                insert_scan_stream(db, stream_scan(scan), catalog, True, False)
+
+            transaction.rollback()
+
+        return len(scan.regions)
+
+    results.results.append(run_benchmark_case('insert-scan/bulk', insert, args.repeat))
+
+
+def run_query_benchmarks(db: Database, args: argparse.Namespace, results: BenchmarkResults):
+    """
+    Benchmark the intersecting regions queries of a scan for each level of detail, engine, query mode and bounding box
+    filter, and the region queries across all scans.
+    """
+
+    if args.scan is not None:
+        scan = try_get_scan(db, args.scan)
+        if scan is None:
+            return print_error_exit(f"No scan found for file name '{args.scan}'.")
+
+        lod_levels = args.lod if args.lod is not None else get_scan_lod_levels(db, scan)
+        query_modes = get_query_modes(args.mode, args.distance)
+        boxes: list[Box | None] = [None, '2d', '3d']
+
+        for lod_level in lod_levels:
+            adjacency_max_distance = try_get_scan_region_adjacency_max_distance(db, scan, lod_level)
+            for engine in args.engine:
+                match engine:
+                    case 'postgis':
+                        find = find_intersecting_regions_postgis
+                    case 'local':
+                        find = find_intersecting_regions_local
+                    case 'adjacency':
+                        find = find_intersecting_regions_adjacency
+
+                for intersect, distance in query_modes:
+                    mode = format_query_mode(intersect, distance)
+                    if engine == 'adjacency' and (
+                        adjacency_max_distance is None
+                        or (distance is not None and adjacency_max_distance < distance)
+                    ):
+                        print_warning(
+                            f"Skipping the adjacency engine for LOD level {lod_level} and query '{mode}', whose region"
+                            f" adjacency is not computed for that query."
+                        )
+                        continue
+
+                    for box in boxes:
+                        name = (
+                            f'find-intersecting-regions/{engine}/lod={format_lod_level(lod_level)}'
+                            f'/box={box or "none"}/{mode}'
+                        )
+
+                        def find_regions() -> int:
+                            return len(find(db, scan, lod_level, box, intersect, distance))
+
+                        result = run_benchmark_case(name, find_regions, args.repeat)
+                        if args.explain and engine == 'postgis':
+                            result.plan = explain_query(
+                                db,
+                                build_intersecting_regions_postgis_query(scan, lod_level, box, intersect, distance),
+                            )
+
+                        results.results.append(result)
+
+    region_queries = [('query-regions/all', RegionQuery())] + [
+        (f'query-regions/region={region_name}', RegionQuery(region_names=[region_name]))
+        for region_name in args.region
+    ]
+
+    for name, region_query in region_queries:
+        def query_regions() -> int:
+            return sum(1 for _ in stream_region_query(db, region_query))
+
+        result = run_benchmark_case(name, query_regions, args.repeat)
+        if args.explain:
+            result.plan = explain_query(db, build_region_query(region_query))
+
+        results.results.append(result)
+
+
+def run_benchmark(args: argparse.Namespace):
+    results = BenchmarkResults(
+        created=datetime.now(UTC).isoformat(),
+        scans_count=None,
+        parameters={
+            'scan': args.scan,
+            'lod': args.lod,
+            'mode': args.mode,
+            'distance': args.distance,
+            'engine': args.engine,
+            'region': args.region,
+            'insert': str(args.insert) if args.insert is not None else None,
+            'scan_image': str(args.scan_image) if args.scan_image is not None else None,
+            'repeat': args.repeat,
+        },
+    )
+
+    if args.scan_image is not None:
+        run_extraction_benchmarks(args, results)
+
+    if not args.no_database:
+        engine = get_engine()
+
+        with Database(engine) as db:
+            results.scans_count = db.execute(select(func.count(DBScan.id))).scalar_one()
+            print(f"Found {results.scans_count} scans in the database.")
+
+            run_query_benchmarks(db, args, results)
+
+        if args.insert is not None:
+            run_insert_benchmarks(engine, args, results)
+
+    print(f"Writing benchmark results to '{args.output}'.")
+    write_benchmark_results(results, args.output)
+
+
+def diff_benchmark(args: argparse.Namespace):
+    base = read_benchmark_results(args.base)
+    new  = read_benchmark_results(args.new)
+
+    if base.scans_count != new.scans_count:
+        print_warning(
+            f"The benchmarks were run with different numbers of scans ({base.scans_count} and {new.scans_count})."
+        )
+
+    regressions = 0
+    for difference in diff_benchmark_results(base, new):
+        if difference.base_duration is None:
+            print(f"{difference.name}: new case ({difference.new_duration:.3f} s)")
+            continue
+
+        if difference.new_duration is None:
+            print(f"{difference.name}: removed case ({difference.base_duration:.3f} s)")
+            continue
+
+        change = difference.change
+        status = ''
+        if change is not None and change > args.threshold:
+            status = ' REGRESSION'
+            regressions += 1
+
+        if difference.base_rows != difference.new_rows:
+            status += f' ROWS {difference.base_rows} -> {difference.new_rows}'
+            regressions += 1
+
+        change_string = f'{change:+.1%}' if change is not None else 'n/a'
+        print(
+            f"{difference.name}: {difference.base_duration:.3f} s -> {difference.new_duration:.3f} s"
+            f" ({change_string}){status}"
+        )
+
+    if regressions > 0:
+        print_error_exit(f"Found {regressions} regressions.")
+
+
+def format_lod_level(lod_level: int | None) -> str:
+    return str(lod_level) if lod_level is not None else 'native'
+
+
+def get_query_modes(modes: list[QueryMode], distances: list[float]) -> list[tuple[bool, float | None]]:
+    """
+    Get the intersect and distance arguments of the intersecting regions queries of the given modes, the distance mode
+    being run once for each distance.
+    """
+
+    query_modes: list[tuple[bool, float | None]] = []
+    for mode in modes:
+        match mode:
+            case 'none':
+                query_modes.append((False, None))
+            case 'intersect':
+                query_modes.append((True, None))
+            case 'distance':
+                query_modes.extend((False, distance) for distance in distances)
+
+    return query_modes
+
+
+def format_query_mode(intersect: bool, distance: float | None) -> str:
+    if intersect:
+        return 'intersect'
+
+    if distance is not None:
+        return f'distance={distance}'
+
+    return 'none'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='benchmark',
+        description="Run a reproducible benchmark of the extraction, insertion and queries, or compare two results.",
+    )
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run',
+        help="Run the benchmark and write its results in a JSON file.")
+
+    run_parser.add_argument('--output',
+        required=True,
+        type=Path,
+        help="The JSON file in which to write the benchmark results.")
+
+    run_parser.add_argument('--repeat',
+        type=int,
+        default=3,
+        help="Number of times each benchmark case is run.")
+
+    run_parser.add_argument('--scan',
+        help="File name of the scan in the database whose intersecting regions are queried.")
+
+    run_parser.add_argument('--lod',
+        type=parse_lod_levels,
+        help=(
+            "Comma-separated levels of detail of the benchmark, 'native' meaning no simplification. By default, all the"
+            " levels of the scan in the database are queried and the native level is extracted."
+        ))
+
+    run_parser.add_argument('--mode',
+        nargs='+',
+        choices=['none', 'intersect', 'distance'],
+        default=['none', 'intersect', 'distance'],
+        help=(
+            "Modes of the intersecting regions queries, which either only filter by bounding box, check whether the"
+            " regions exactly intersect, or check whether the regions are within each distance of each other."
+        ))
+
+    run_parser.add_argument('--distance',
+        type=float,
+        nargs='+',
+        default=[1.0],
+        help="Distances of the intersecting regions queries in the distance mode.")
+
+    run_parser.add_argument('--engine',
+        nargs='+',
+        choices=['postgis', 'local', 'adjacency'],
+        default=['postgis', 'local'],
+        help="Engines of the intersecting regions queries.")
+
+    run_parser.add_argument('--region',
+        nargs='*',
+        default=[],
+        help="Region names to query across all scans.")
+
+    run_parser.add_argument('--explain',
+        action='store_true',
+        help="Record the plans of the database queries using 'EXPLAIN ANALYZE', which runs each query once more.")
+
+    run_parser.add_argument('--insert',
+        type=Path,
+        help="Scan file whose insertion is benchmarked, the insertions are rolled back.")
+
+    run_parser.add_argument('--atlas-dictionary',
+        type=Path,
+        help="The brain atlas CSV dictionary of the extraction benchmark.")
+
+    run_parser.add_argument('--atlas-image',
+        type=Path,
+        help="The brain atlas NIfTI image of the extraction benchmark.")
+
+    run_parser.add_argument('--scan-image',
+        type=Path,
+        help="The brain scan NIfTI image of the extraction benchmark.")
+
+    run_parser.add_argument('--workers',
+        type=int,
+        default=1,
+        help="Number of processes used to compute the region meshes in the extraction benchmark.")
+
+    run_parser.add_argument('--no-database',
+        action='store_true',
+        help="Only run the extraction benchmark, without connecting to the database.")
+
+    diff_parser = subparsers.add_parser('diff',
+        help="Compare two benchmark results, exiting with an error if there are regressions.")
+
+    diff_parser.add_argument('base',
+        type=Path,
+        help="The reference benchmark results.")
+
+    diff_parser.add_argument('new',
+        type=Path,
+        help="The benchmark results to compare with the reference.")
+
+    diff_parser.add_argument('--threshold',
+        type=float,
+        default=0.1,
+        help="Relative increase of the minimum duration of a case above which it is reported as a regression.")
+
+    args = parser.parse_args()
+
+    match args.command:
+        case 'run':
+            if args.repeat < 1:
+                return print_error_exit("The number of repetitions must be a positive number.")
+
+            if args.scan_image is not None and (args.atlas_image is None or args.atlas_dictionary is None):
+                return print_error_exit("The extraction benchmark requires an atlas image and dictionary.")
+
+            run_benchmark(args)
+        case 'diff':
+            diff_benchmark(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+import argparse
+import glob
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.engine import get_engine
+from brain_region_database.database.ingestion import DEFAULT_INSERT_BATCH_SIZE, insert_scan_stream
+from brain_region_database.database.region_catalog import RegionCatalog
+from brain_region_database.instrumentation import add_instrumentation_arguments, instrument_run, span
+from brain_region_database.scan_file import stream_scan_file
+from brain_region_database.util import print_error_exit, print_warning
+
+
+@dataclass
+class IngestionResult:
+    path        : Path
+    scans_count : int
+    duration    : float
+    error       : str | None
+
+
+class IngestionProgress:
+    """
+    Thread-safe progress and throughput report of an ingestion.
+    """
+
+    def __init__(self, files_count: int | None):
+        self.lock         = Lock()
+        self.start        = time.perf_counter()
+        self.files_count  = files_count
+        self.files_done   = 0
+        self.files_failed = 0
+        self.scans_done   = 0
+
+    def report(self, result: IngestionResult):
+        with self.lock:
+            self.files_done += 1
+            self.scans_done += result.scans_count
+            elapsed = time.perf_counter() - self.start
+            total = f"/{self.files_count}" if self.files_count is not None else ""
+            if result.error is not None:
+                self.files_failed += 1
+                print_warning(f"[{self.files_done}{total}] Could not ingest '{result.path}': {result.error}")
+            else:
+                print(
+                    f"[{self.files_done}{total}] Ingested '{result.path}' ({result.scans_count} scans) in"
+                    f" {result.duration:.2f} s, {self.scans_done / elapsed:.2f} scans/s overall."
+                )
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        print(
+            f"Ingested {self.scans_done} scans from {self.files_done - self.files_failed} files in {elapsed:.2f} s"
+            f" ({self.scans_done / elapsed:.2f} scans/s), {self.files_failed} files failed."
+        )
+
+
+def bulk_insert(
+    engine: Engine,
+    paths: Iterator[Path],
+    files_count: int | None,
+    workers: int,
+    adjacency: bool,
+    batch_size: int,
+) -> IngestionProgress:
+    """
+    Ingest scan files concurrently in a pool of worker threads that share the engine connection pool and the regions
+    catalog. Each scan is inserted in its own transaction, so that a failing file does not roll back the other scans.
+    """
+
+    progress = IngestionProgress(files_count)
+    catalog = RegionCatalog(engine)
+
+    def report(future: Future[IngestionResult]):
+        progress.report(future.result())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path in paths:
+            future = executor.submit(ingest_scan_file, engine, catalog, path, adjacency, batch_size)
+            future.add_done_callback(report)
+
+    progress.summary()
+    return progress
+
+
+def ingest_scan_file(
+    engine: Engine,
+    catalog: RegionCatalog,
+    path: Path,
+    adjacency: bool,
+    batch_size: int,
+) -> IngestionResult:
+    start = time.perf_counter()
+    scans_count = 0
+    with span('bulk_insert/file'), Database(engine) as db:
+        try:
+            for scan_stream in stream_scan_file(path):
+                insert_scan_stream(db, scan_stream, catalog, True, adjacency, batch_size)
+                scans_count += 1
+        # An invalid file or a failed insertion must only stop the ingestion of that file.
+        except Exception as error:
+            db.rollback()
+            return IngestionResult(path, scans_count, time.perf_counter() - start, str(error) or type(error).__name__)
+
+    return IngestionResult(path, scans_count, time.perf_counter() - start, None)
+
+
+def expand_sources(sources: list[str], pattern: str) -> list[Path]:
+    """
+    Expand the scan file sources, which can be files, directories whose files match the pattern, or glob patterns.
+    """
+
+    paths: list[Path] = []
+    for source in sources:
+        path = Path(source)
+        if path.is_dir():
+            paths.extend(sorted(file for file in path.glob(pattern) if file.is_file()))
+        elif path.is_file():
+            paths.append(path)
+        else:
+            matches = sorted(glob.glob(source, recursive=True))
+            if matches == []:
+                return print_error_exit(f"No scan file found for '{source}'.")
+
+            paths.extend(Path(match) for match in matches)
+
+    return paths
+
+
+def read_queue_paths() -> Iterator[Path]:
+    """
+    Read scan file paths from the standard input as they arrive, one per line.
+    """
+
+    for line in sys.stdin:
+        line = line.strip()
+        if line != '':
+            yield Path(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Insert many scan files into the database concurrently using a single pool of connections."
+    )
+
+    parser.add_argument('sources',
+        nargs='*',
+        help=(
+            "Scan files, directories or glob patterns to insert. If not provided, the scan file paths are read from the"
+            " standard input as they arrive, one per line."
+        ))
+
+    parser.add_argument('--pattern',
+        default='*.json',
+        help="Glob pattern of the scan files to insert in the source directories.")
+
+    parser.add_argument('--workers',
+        type=int,
+        default=4,
+        help="Number of scan files inserted concurrently, which is also the number of database connections.")
+
+    parser.add_argument('--batch-size',
+        type=int,
+        default=DEFAULT_INSERT_BATCH_SIZE,
+        help="Number of scan regions read from a file before inserting them in the database.")
+
+    parser.add_argument('--adjacency',
+        action='store_true',
+        help="Precompute the region adjacency of the inserted scan regions.")
+
+    add_instrumentation_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        return print_error_exit("The number of workers must be a positive number.")
+
+    if args.batch_size < 1:
+        return print_error_exit("The batch size must be a positive number.")
+
+    if args.sources != []:
+        paths = expand_sources(args.sources, args.pattern)
+        print(f"Found {len(paths)} scan files to insert.")
+        files_count = len(paths)
+        paths = iter(paths)
+    else:
+        print("Reading scan file paths from the standard input...")
+        files_count = None
+        paths = read_queue_paths()
+
+    with instrument_run(args):
+        # One connection is needed per worker, plus one for the shared regions catalog.
+        engine = get_engine(pool_size=args.workers + 1)
+
+        progress = bulk_insert(engine, paths, files_count, args.workers, args.adjacency, args.batch_size)
+
+    if progress.files_failed > 0:
+        sys.exit(-1)
+
+
+if __name__ == '__main__':
+    main()
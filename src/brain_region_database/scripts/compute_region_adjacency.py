@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import argparse
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session as Database
+
+from brain_region_database.database.adjacency import DEFAULT_ADJACENCY_MAX_DISTANCE, compute_scan_region_adjacency
+from brain_region_database.database.engine import get_engine_session
+from brain_region_database.database.models import DBScan
+from brain_region_database.database.queries import (
+    get_scan_lod_levels,
+    try_get_scan,
+    try_get_scan_region_adjacency_max_distance,
+)
+from brain_region_database.util import print_error_exit
+
+
+def compute_region_adjacency(db: Database, scans: list[DBScan], max_distance: float, force: bool):
+    """
+    Compute the region adjacency of all the levels of the given scans, skipping the levels whose adjacency was already
+    computed up to the maximum distance unless forced.
+    """
+
+    for scan in scans:
+        for lod_level in get_scan_lod_levels(db, scan):
+            adjacency_max_distance = try_get_scan_region_adjacency_max_distance(db, scan, lod_level)
+            if not force and adjacency_max_distance is not None and adjacency_max_distance >= max_distance:
+                print(f"Region adjacency of scan '{scan.file_name}' and LOD level {lod_level} already computed.")
+                continue
+
+            print(f"Computing region adjacency of scan '{scan.file_name}' and LOD level {lod_level}...")
+            adjacencies = compute_scan_region_adjacency(db, scan, lod_level, max_distance)
+            db.commit()
+            print(f"Successfully inserted {len(adjacencies)} region pairs.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Precompute the spatial relations between the regions of scans in the region adjacency table."
+    )
+
+    parser.add_argument('scans',
+        nargs='*',
+        help="File names of the scans whose region adjacency to compute. If not provided, all the scans are used.")
+
+    parser.add_argument('--max-distance',
+        type=float,
+        default=DEFAULT_ADJACENCY_MAX_DISTANCE,
+        help="The maximum distance up to which the distances between regions are stored.")
+
+    parser.add_argument('--force',
+        action='store_true',
+        help="Recompute the region adjacency of the levels that were already computed.")
+
+    args = parser.parse_args()
+
+    db = get_engine_session()
+
+    if args.scans == []:
+        scans = list(db.execute(select(DBScan)).scalars().all())
+    else:
+        scans: list[DBScan] = []
+        for file_name in args.scans:
+            scan = try_get_scan(db, file_name)
+            if scan is None:
+                return print_error_exit(f"No scan found for file name '{file_name}'.")
+
+            scans.append(scan)
+
+    compute_region_adjacency(db, scans, args.max_distance, args.force)
+
+    print("Success!")
+
+
+if __name__ == '__main__':
+    main()
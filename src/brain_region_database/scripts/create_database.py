@@ -2,13 +2,16 @@
 
 import argparse
 
-from sqlalchemy import Engine, inspect, text
+import numpy as np
+from sqlalchemy import Connection, Engine, inspect, text
 from sqlalchemy.dialects.postgresql import dialect as postgresql_dialect
 from sqlalchemy.schema import CreateTable
 
 from brain_region_database.database.engine import get_engine
+from brain_region_database.database.geometries import create_box
 from brain_region_database.database.models import Base
-from brain_region_database.util import print_error_exit
+from brain_region_database.scan import Point3D
+from brain_region_database.util import print_error_exit, print_warning
 
 
 def create_database(engine: Engine):
@@ -28,6 +31,96 @@ def create_database(engine: Engine):
         print_error_exit(f"Error while creating the database:\n{error}")
 
 
+def upgrade_database(engine: Engine):
+    """
+    Upgrade a database created by a previous version of the schema without dropping its data. Each step is skipped if
+    it was already applied, so the upgrade can be run several times.
+    """
+
+    try:
+        with engine.begin() as connection:
+            print("Creating missing tables...")
+            Base.metadata.create_all(connection)
+
+            duplicate_names = connection.execute(text(
+                "SELECT name FROM region GROUP BY name HAVING count(*) > 1"
+            )).scalars().all()
+
+            if duplicate_names != []:
+                return print_error_exit(
+                    f"Found duplicate region names ({', '.join(duplicate_names)}), which must be merged before adding"
+                    " the unique index on the region names."
+                )
+
+            print("Adding the region name unique index...")
+            create_index(connection, 'region', 'ix_region_name')
+
+            print("Adding the region bounding box columns...")
+            for table in ('scan_region', 'scan_region_lod'):
+                connection.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS bounding_box geometry(POLYHEDRALSURFACEZ, 0)"
+                ))
+
+            print("Computing the missing region LOD bounding boxes...")
+            backfill_scan_region_lod_bounding_boxes(connection)
+            connection.execute(text("ALTER TABLE scan_region_lod ALTER COLUMN bounding_box SET NOT NULL"))
+
+            # The scan region bounding boxes are in voxel space, so they can only be computed from the scan images.
+            missing_count = connection.execute(text(
+                "SELECT count(*) FROM scan_region WHERE bounding_box IS NULL"
+            )).scalar_one()
+
+            if missing_count == 0:
+                connection.execute(text("ALTER TABLE scan_region ALTER COLUMN bounding_box SET NOT NULL"))
+            else:
+                print_warning(
+                    f"{missing_count} scan regions have no voxel bounding box, which is computed when extracting the"
+                    " scan regions. The column remains nullable until these scans are extracted and inserted again."
+                )
+
+            create_index(connection, 'scan_region', 'idx_scan_region_bounding_box')
+            create_index(connection, 'scan_region_lod', 'idx_scan_region_lod_bounding_box')
+    except Exception as error:
+        print_error_exit(f"Error while upgrading the database:\n{error}")
+
+
+def backfill_scan_region_lod_bounding_boxes(connection: Connection):
+    """
+    Compute the bounding boxes of the region LODs that have none from the extent of their shapes, in the same format
+    as the bounding boxes computed at insertion.
+    """
+
+    rows = connection.execute(text(
+        "SELECT id, ST_XMin(box), ST_YMin(box), ST_ZMin(box), ST_XMax(box), ST_YMax(box), ST_ZMax(box)"
+        " FROM (SELECT id, Box3D(shape) AS box FROM scan_region_lod WHERE bounding_box IS NULL) AS boxes"
+    )).all()
+
+    if rows == []:
+        return
+
+    print(f"Computing {len(rows)} region LOD bounding boxes...")
+    update = text("UPDATE scan_region_lod SET bounding_box = ST_GeomFromEWKT(:bounding_box) WHERE id = :id")
+    connection.execute(update, [
+        {
+            'id': row[0],
+            'bounding_box': create_box((
+                Point3D.from_array(np.array(row[1:4])),
+                Point3D.from_array(np.array(row[4:7])),
+            )),
+        } for row in rows
+    ])
+
+
+def create_index(connection: Connection, table_name: str, index_name: str):
+    """
+    Create an index of the schema if it does not exist yet.
+    """
+
+    table = Base.metadata.tables[table_name]
+    index = next(index for index in table.indexes if index.name == index_name)
+    index.create(connection, checkfirst=True)
+
+
 def print_create_database() -> None:
     dialect = postgresql_dialect()
     for table in Base.metadata.sorted_tables:
@@ -36,7 +129,12 @@ def print_create_database() -> None:
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Create or reset the PostGIS MRI scans database.")
+    parser = argparse.ArgumentParser(
+        description=(
+            "Create or reset the PostGIS MRI scans database. A database created by a previous version of the schema"
+            " must either be reset, which drops its data, or upgraded using '--upgrade'."
+        ),
+    )
 
     parser.add_argument(
         "--print-only",
@@ -44,6 +142,16 @@ def main() -> None:
         help="Print the SQL statements instead of executing them."
     )
 
+    parser.add_argument(
+        "--upgrade",
+        action="store_true",
+        help=(
+            "Upgrade the existing database to the current schema without dropping its data: create the region"
+            " adjacency table, the region name unique index and the region bounding box columns, and compute the"
+            " bounding boxes of the existing region LODs."
+        )
+    )
+
     args = parser.parse_args()
 
     if args.print_only:
@@ -51,7 +159,11 @@ def main() -> None:
         return
 
     engine = get_engine()
-    create_database(engine)
+    if args.upgrade:
+        upgrade_database(engine)
+    else:
+        create_database(engine)
+
     print("Success!")
 
 
@@ -1,16 +1,26 @@
 #!/usr/bin/env python
 
 import argparse
-import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 import numpy as np
 
 from brain_region_database.atlas import AtlasRegion, load_atlas_dictionary, print_atlas_regions
-from brain_region_database.nifti import NDArray3, NiftiImage, ants_to_nib, get_voxel_size, nib_to_ants, load_nifti_image
-from brain_region_database.process.registration import register_nifti
-from brain_region_database.process.vectorization import compute_nifti_mask_mesh
+from brain_region_database.instrumentation import add_instrumentation_arguments, instrument_run, span
+from brain_region_database.nifti import NiftiImage, ants_to_nib, get_nifti_data, get_voxel_size, nib_to_ants, load_nifti_image
+from brain_region_database.process.registration import get_default_registration_cache_dir, register_nifti
+from brain_region_database.process.statistics import RegionStatistics, compute_regions_statistics
+from brain_region_database.process.vectorization import (
+    compute_mask_meshes,
+    get_bounding_box_slices,
+    translate_affine,
+)
 from brain_region_database.scan import Point3D, Scan, ScanRegion
+from brain_region_database.scan_file import write_scan_binary, write_scan_json
+from brain_region_database.util import print_error_exit
 
 # ruff: noqa
 # analyze-scan-regions --atlas-image ../atlases/mni_icbm152_nlin_sym_09c_CerebrA_nifti/mni_icbm152_CerebrA_tal_nlin_sym_09c.nii --atlas-dictionary ../atlases/mni_icbm152_nlin_sym_09c_CerebrA_nifti/CerebrA_LabelDetails.csv --scan ../../COMP5411/demo_587630_V1_t1_001.nii
@@ -35,15 +45,51 @@ def main() -> None:
         help="The brain scan NIfTI image.")
 
     parser.add_argument('--lod',
+        type=parse_lod_levels,
+        default=[None],
+        help=(
+            "Maximum number of faces per region meshes, or a comma-separated list of them such as"
+            " '100,200,500,native' to extract several levels of detail in one run, 'native' meaning no simplification."
+        ))
+
+    parser.add_argument('--workers',
         type=int,
-        help="Maximum number of faces per region meshes.")
+        default=1,
+        help="Number of processes used to compute the region meshes in parallel.")
+
+    parser.add_argument('--registration-cache',
+        type=Path,
+        default=get_default_registration_cache_dir(),
+        help="Directory in which the atlas registrations are cached, so that a scan is only registered once.")
+
+    parser.add_argument('--no-registration-cache',
+        action='store_true',
+        help="Register the atlas on the scan without reading or writing the registration cache.")
 
     parser.add_argument('--output',
         type=Path,
         help="Print the scan information JSON in a file instead of the console.")
 
+    parser.add_argument('--format',
+        choices=['json', 'binary'],
+        default='json',
+        help=(
+            "Format of the output file, the binary format stores the region shapes as raw arrays, which is smaller and"
+            " faster to read."
+        ))
+
+    add_instrumentation_arguments(parser)
+
     args = parser.parse_args()
 
+    if args.format == 'binary' and args.output is None:
+        print_error_exit("The binary format requires an output file.")
+
+    with instrument_run(args):
+        extract_scan_regions(args)
+
+
+def extract_scan_regions(args: argparse.Namespace) -> None:
     atlas_dictionary_path = Path(args.atlas_dictionary)
     atlas_image_path      = Path(args.atlas_image)
     scan_path             = Path(args.scan)
@@ -54,21 +100,40 @@ def main() -> None:
 
     print_atlas_regions(atlas_dictionary)
 
-    atlas_image = ants_to_nib(register_nifti(
-        nib_to_ants(atlas_image),
-        nib_to_ants(scan_image),
-        'nearest',
-    ))
-
-    atlas_data: NDArray3[np.float32] = atlas_image.get_fdata()
-    scan_data:  NDArray3[np.float32] = scan_image.get_fdata()
+    with span('extract/registration'):
+        atlas_image = ants_to_nib(register_nifti(
+            nib_to_ants(atlas_image),
+            nib_to_ants(scan_image),
+            'nearest',
+            None if args.no_registration_cache else args.registration_cache,
+        ))
+
+    atlas_data = get_nifti_data(atlas_image)
+    scan_data  = get_nifti_data(scan_image)
+
+    print("Computing regions statistics...")
+    with span('extract/statistics', atlas_data.nbytes + scan_data.nbytes):
+        regions_statistics = compute_regions_statistics(
+            atlas_data,
+            scan_data,
+            [region.value for region in atlas_dictionary.regions],
+        )
+
+    with span('extract/meshes'):
+        meshes = compute_regions_meshes(
+            atlas_image,
+            atlas_dictionary.regions,
+            regions_statistics,
+            atlas_data,
+            args.lod,
+            args.workers,
+        )
 
     regions: list[ScanRegion] = []
 
-    for region in atlas_dictionary.regions:
-        print(f"Processing region '{region.name}' ({region.value})")
-
-        regions.append(collect_region_statistics(atlas_image, region, atlas_data, scan_data, args.lod))
+    for i, lod_level in enumerate(args.lod):
+        for region, statistics, region_meshes in zip(atlas_dictionary.regions, regions_statistics, meshes):
+            regions.append(collect_region_statistics(region, statistics, region_meshes[i], lod_level))
 
     scan = Scan(
         file_name=scan_path.name,
@@ -78,62 +143,107 @@ def main() -> None:
         regions=regions
     )
 
-    # Convert the scan object to JSON.
-    scan_json = json.dumps(scan.model_dump(), indent=4)
-
     if args.output:
         print(f"Writing scan information to '{args.output}'.")
-        with open(args.output, 'w') as f:
-            f.write(scan_json)
+        match args.format:
+            case 'json':
+                with open(args.output, 'w') as f:
+                    write_scan_json(scan, f)
+            case 'binary':
+                with open(args.output, 'wb') as f:
+                    write_scan_binary(scan, f)
     else:
-        print(scan_json)
+        write_scan_json(scan, sys.stdout)
+        print()
+
 
+def compute_regions_meshes(
+    original: NiftiImage,
+    regions: list[AtlasRegion],
+    regions_statistics: list[RegionStatistics],
+    atlas_data: np.ndarray,
+    faces_limits: list[int | None],
+    workers: int,
+) -> list[list[tuple[np.ndarray, np.ndarray]]]:
+    """
+    Compute the region meshes, in a pool of worker processes if several workers are requested. Each region is meshed
+    from its mask cropped to its bounding box, along with the affine transform of that crop, so that only small masks
+    are created and sent to the workers. The meshes of each region are returned in the atlas order, with one mesh per
+    level of detail.
+    """
+
+    zooms = original.header.get_zooms()  # type: ignore
+
+    region_masks:   list[np.ndarray] = []
+    region_affines: list[np.ndarray] = []
+    for region, statistics in zip(regions, regions_statistics):
+        slices = get_bounding_box_slices(statistics.bounding_box, atlas_data.shape)
+        region_masks.append(atlas_data[slices] == region.value)
+        region_affines.append(translate_affine(original.affine, zooms, tuple(s.start for s in slices)))  # type: ignore
+
+    meshes: list[list[tuple[np.ndarray, np.ndarray]]] = []
+
+    if workers <= 1:
+        for region, region_mask, region_affine in zip(regions, region_masks, region_affines):
+            print(f"Processing region '{region.name}' ({region.value})")
+            meshes.append(compute_mask_meshes(region_mask, zooms, region_affine, faces_limits))
+
+        return meshes
+
+    print(f"Computing regions meshes using {workers} workers...")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(compute_mask_meshes, region_masks, repeat(zooms), region_affines, repeat(faces_limits))
+        for region, region_meshes in zip(regions, results):
+            print(f"Processed region '{region.name}' ({region.value})")
+            meshes.append(region_meshes)
+
+    return meshes
+
+
+def parse_lod_levels(value: str) -> list[int | None]:
+    """
+    Parse a comma-separated list of levels of detail, where 'native' is the unsimplified level.
+    """
+
+    lod_levels: list[int | None] = []
+    for level in value.split(','):
+        level = level.strip()
+        if level == 'native':
+            lod_levels.append(None)
+        elif level.isdigit() and int(level) > 0:
+            lod_levels.append(int(level))
+        else:
+            raise argparse.ArgumentTypeError(f"Invalid level of detail '{level}'.")
+
+    # Remove the duplicate levels while preserving the order.
+    return list(dict.fromkeys(lod_levels))
 
 
 def collect_region_statistics(
-    original: NiftiImage,
     region: AtlasRegion,
-    atlas_data: NDArray3[np.float32],
-    scan_data: NDArray3[np.float32],
+    statistics: RegionStatistics,
+    mesh: tuple[np.ndarray, np.ndarray],
     faces_limit: int | None,
 ) -> ScanRegion:
-    # Create the mask of the region.
-    region_mask = (atlas_data == region.value)
-
-    # Get coordinates of the region
-    region_coordinates = np.argwhere(region_mask)
-
-    # Apply the region mask to the scan data.
-    region_scan_data = scan_data[region_mask]
-
-    # Compute centroid.
-    centroid = np.mean(region_coordinates, axis=0)
-
-    # Compute bounding box.
-    min_bounding_box = np.min(region_coordinates, axis=0).astype(int)
-    max_bounding_box = np.max(region_coordinates, axis=0).astype(int)
-
-    vertices, faces = compute_nifti_mask_mesh(original, region_mask, faces_limit)
+    vertices, faces = mesh
 
     return ScanRegion(
         name=region.name,
         value=region.value,
-        voxel_count=np.sum(region_mask).item(),
-        mean_intensity=np.mean(region_scan_data).item(),
-        std_intensity=np.std(region_scan_data).item(),
-        min_intensity=np.min(region_scan_data).item(),
-        max_intensity=np.max(region_scan_data).item(),
-        median_intensity=np.median(region_scan_data).item(),
-        centroid=Point3D.from_array(centroid),
+        voxel_count=statistics.voxel_count,
+        mean_intensity=statistics.mean_intensity,
+        std_intensity=statistics.std_intensity,
+        min_intensity=statistics.min_intensity,
+        max_intensity=statistics.max_intensity,
+        median_intensity=statistics.median_intensity,
+        centroid=Point3D.from_array(statistics.centroid),
         bounding_box=(
-            Point3D.from_array(min_bounding_box),
-            Point3D.from_array(max_bounding_box),
+            Point3D.from_array(statistics.bounding_box[0]),
+            Point3D.from_array(statistics.bounding_box[1]),
         ),
         lod_level=faces_limit,
-        shape=(
-            [tuple(row) for row in vertices],
-            [tuple(row) for row in faces],
-        ),
+        shape=(vertices, faces),
     )
 
 
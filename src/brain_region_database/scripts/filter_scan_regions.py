@@ -7,7 +7,7 @@ import nibabel as nib
 from nibabel.nifti1 import Nifti1Image
 
 from brain_region_database.atlas import load_atlas_dictionary, print_atlas_regions
-from brain_region_database.nifti import has_same_dims, load_nifti_image, resample_to_same_dims
+from brain_region_database.nifti import get_nifti_data, has_same_dims, load_nifti_image, resample_to_same_dims
 from brain_region_database.util import print_error_exit
 
 # ruff: noqa
@@ -58,8 +58,8 @@ def main() -> None:
         if not output_dir_path.is_dir():
             print_error_exit(f"Path '{output_dir_path}' exists but is not a directory.")
 
-    atlas_data = atlas_image.get_fdata()
-    scan_data  = scan_image.get_fdata()
+    atlas_data = get_nifti_data(atlas_image)
+    scan_data  = get_nifti_data(scan_image)
 
     for region in atlas_dictionary.regions:
         print(f"Processing region '{region.name}' ({region.value})")
@@ -1,21 +1,39 @@
 #!/usr/bin/env python
 
 import argparse
+from dataclasses import dataclass
 from typing import Literal
 
 from geoalchemy2.functions import ST_3DDWithin, ST_3DIntersects
-from sqlalchemy import select
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session as Database
 from sqlalchemy.orm import aliased
 
+from brain_region_database.database.adjacency import build_region_hierarchies
 from brain_region_database.database.engine import get_engine_session
-from brain_region_database.database.models import DBRegion, DBScan, DBScanRegionLOD
+from brain_region_database.database.models import DBRegion, DBScan, DBScanRegionAdjacency, DBScanRegionLOD
 from brain_region_database.database.monitor import DatabaseMonitor
-from brain_region_database.database.queries import get_scan_regions_lod_with_scan_and_level
+from brain_region_database.database.queries import (
+    get_scan_region_lod_shapes_wkb,
+    get_scan_regions_lod_with_scan_and_level,
+    try_get_scan_region_adjacency_max_distance,
+)
+from brain_region_database.instrumentation import add_instrumentation_arguments, instrument_run, span
+from brain_region_database.process.intersection import compute_surfaces_distance, hierarchies_boxes_overlap
 from brain_region_database.util import print_error_exit
 
 type Box = Literal['2d', '3d']
 
+type Engine = Literal['auto', 'adjacency', 'postgis', 'local']
+
+
+@dataclass
+class RegionPair:
+    region_a_id : int
+    region_a    : str
+    region_b_id : int
+    region_b    : str
+
 
 def find_intersecting_regions(
     db: Database,
@@ -24,6 +42,7 @@ def find_intersecting_regions(
     box: Box | None,
     intersect: bool,
     distance: float | None,
+    engine: Engine = 'auto',
 ):
     """
     Find all the regions within an epsilon distance of each other.
@@ -50,6 +69,72 @@ def find_intersecting_regions(
 
     print(f"Found {len(region_lods)} regions LOD for scan '{scan.file_name}' and LOD level {lod_level}.")
 
+    engine = resolve_engine(db, scan, lod_level, distance, engine)
+
+    match engine:
+        case 'adjacency':
+            results = find_intersecting_regions_adjacency(db, scan, lod_level, box, intersect, distance)
+        case 'postgis':
+            results = find_intersecting_regions_postgis(db, scan, lod_level, box, intersect, distance)
+        case 'local':
+            results = find_intersecting_regions_local(db, scan, lod_level, box, intersect, distance)
+        case 'auto':
+            raise ValueError("Unresolved engine.")
+
+    print(f"Found {len(results)} intersecting region pairs:")
+    for result in results:
+        print(f"  {result.region_a} (ID: {result.region_a_id}) <-> {result.region_b} (ID: {result.region_b_id})")
+
+
+def resolve_engine(db: Database, scan: DBScan, lod_level: int | None, distance: float | None, engine: Engine) -> Engine:
+    """
+    Resolve the engine to use, choosing the adjacency table if it can answer the query in the automatic mode.
+    """
+
+    if engine != 'auto' and engine != 'adjacency':
+        return engine
+
+    adjacency_max_distance = try_get_scan_region_adjacency_max_distance(db, scan, lod_level)
+    if adjacency_max_distance is not None and (distance is None or distance <= adjacency_max_distance):
+        print(f"Using the precomputed region adjacency (up to distance {adjacency_max_distance}).")
+        return 'adjacency'
+
+    if engine == 'adjacency':
+        return print_error_exit(
+            f"No region adjacency computed for scan '{scan.file_name}' and LOD level {lod_level} up to distance"
+            f" {distance}."
+        )
+
+    return 'postgis'
+
+
+def find_intersecting_regions_postgis(
+    db: Database,
+    scan: DBScan,
+    lod_level: int | None,
+    box: Box | None,
+    intersect: bool,
+    distance: float | None,
+) -> list[RegionPair]:
+    """
+    Find the intersecting region pairs of a scan using a PostGIS spatial self-join.
+    """
+
+    query = build_intersecting_regions_postgis_query(scan, lod_level, box, intersect, distance)
+
+    return [
+        RegionPair(result.region_a_id, result.region_a, result.region_b_id, result.region_b)
+        for result in db.execute(query).all()
+    ]
+
+
+def build_intersecting_regions_postgis_query(
+    scan: DBScan,
+    lod_level: int | None,
+    box: Box | None,
+    intersect: bool,
+    distance: float | None,
+) -> Select:
     db_scan_region_a = aliased(DBRegion)
     db_scan_region_b = aliased(DBRegion)
     db_scan_region_lod_a = aliased(DBScanRegionLOD)
@@ -81,7 +166,8 @@ def find_intersecting_regions(
             case '3d':
                 op = '&&&'
 
-        query = query.where(db_scan_region_lod_a.shape.op(op)(db_scan_region_lod_b.shape))
+        # Compare the bounding boxes columns rather than the shapes to avoid reading the whole shapes.
+        query = query.where(db_scan_region_lod_a.bounding_box.op(op)(db_scan_region_lod_b.bounding_box))
 
     if intersect:
         query = query.where(ST_3DIntersects(db_scan_region_lod_a.shape, db_scan_region_lod_b.shape))
@@ -89,11 +175,113 @@ def find_intersecting_regions(
     if distance is not None:
         query = query.where(ST_3DDWithin(db_scan_region_lod_a.shape, db_scan_region_lod_b.shape, distance))
 
-    results = db.execute(query).all()
+    return query
 
-    print(f"Found {len(results)} intersecting region pairs:")
-    for result in results:
-        print(f"  {result.region_a} (ID: {result.region_a_id}) <-> {result.region_b} (ID: {result.region_b_id})")
+
+def find_intersecting_regions_adjacency(
+    db: Database,
+    scan: DBScan,
+    lod_level: int | None,
+    box: Box | None,
+    intersect: bool,
+    distance: float | None,
+) -> list[RegionPair]:
+    """
+    Find the intersecting region pairs of a scan using the precomputed region adjacency table.
+    """
+
+    db_region_a = aliased(DBRegion)
+    db_region_b = aliased(DBRegion)
+
+    query = (
+        select(
+            db_region_a.id.label('region_a_id'),
+            db_region_a.name.label('region_a'),
+            db_region_b.id.label('region_b_id'),
+            db_region_b.name.label('region_b'),
+        )
+        .select_from(DBScanRegionAdjacency)
+        .join(db_region_a, DBScanRegionAdjacency.region_a_id == db_region_a.id)
+        .join(db_region_b, DBScanRegionAdjacency.region_b_id == db_region_b.id)
+        .where(
+            DBScanRegionAdjacency.scan == scan,
+            DBScanRegionAdjacency.level == lod_level,
+        )
+        .order_by(db_region_a.id, db_region_b.id)
+    )
+
+    if box is not None:
+        match box:
+            case '2d':
+                query = query.where(DBScanRegionAdjacency.box_2d_overlap)
+            case '3d':
+                query = query.where(DBScanRegionAdjacency.box_3d_overlap)
+
+    if intersect:
+        query = query.where(DBScanRegionAdjacency.intersects)
+
+    if distance is not None:
+        query = query.where(DBScanRegionAdjacency.distance <= distance)
+
+    return [
+        RegionPair(result.region_a_id, result.region_a, result.region_b_id, result.region_b)
+        for result in db.execute(query).all()
+    ]
+
+
+def find_intersecting_regions_local(
+    db: Database,
+    scan: DBScan,
+    lod_level: int | None,
+    box: Box | None,
+    intersect: bool,
+    distance: float | None,
+) -> list[RegionPair]:
+    """
+    Find the intersecting region pairs of a scan in-process. The region shapes are fetched once, and the exact
+    intersections and distances are computed using a bounding volume hierarchy of each region.
+    """
+
+    shapes = get_scan_region_lod_shapes_wkb(db, scan, lod_level)
+
+    print("Building regions bounding volume hierarchies...")
+    with span('intersection/hierarchies', sum(len(shape) for _, _, shape in shapes)):
+        hierarchies = build_region_hierarchies([shape for _, _, shape in shapes])
+
+    # Only the distance up to the queried distance is needed, or zero to only check for intersections. Unless an
+    # intersection is required, the distance computation can stop at the first triangle pair within that distance.
+    max_distance = distance if distance is not None else 0.0
+    threshold    = max_distance if not intersect else 0.0
+
+    results: list[RegionPair] = []
+    for i, (region_a_id, region_a, _) in enumerate(shapes):
+        for j in range(i + 1, len(shapes)):
+            region_b_id, region_b, _ = shapes[j]
+            hierarchy_a = hierarchies[i]
+            hierarchy_b = hierarchies[j]
+
+            if box is not None and not hierarchies_boxes_overlap(hierarchy_a, hierarchy_b, get_box_axes(box)):
+                continue
+
+            if intersect or distance is not None:
+                surfaces_distance = compute_surfaces_distance(hierarchy_a, hierarchy_b, max_distance, threshold)
+                if intersect and surfaces_distance > 0:
+                    continue
+
+                if distance is not None and surfaces_distance > distance:
+                    continue
+
+            results.append(RegionPair(region_a_id, region_a, region_b_id, region_b))
+
+    return results
+
+
+def get_box_axes(box: Box) -> int:
+    match box:
+        case '2d':
+            return 2
+        case '3d':
+            return 3
 
 
 # Command line interface
@@ -124,11 +312,23 @@ def main() -> None:
         type=float,
         help="Check whether the regions are within a given distance of each other using 'ST_3DIntersects'.")
 
+    parser.add_argument('--engine',
+        choices=['auto', 'adjacency', 'postgis', 'local'],
+        default='auto',
+        help=(
+            "Read the intersections from the precomputed region adjacency table, compute them in the database using"
+            " PostGIS, or locally using bounding volume hierarchies of the region shapes. By default, the adjacency"
+            " table is used if it was computed for the scan, level and distance, and PostGIS is used otherwise."
+        ))
+
+    add_instrumentation_arguments(parser)
+
     args = parser.parse_args()
 
-    db = get_engine_session()
+    with instrument_run(args):
+        db = get_engine_session()
 
-    find_intersecting_regions(db, args.scan, args.lod, args.box, args.intersect, args.distance)
+        find_intersecting_regions(db, args.scan, args.lod, args.box, args.intersect, args.distance, args.engine)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from brain_region_database.database.engine import get_engine_session
+from brain_region_database.database.ingestion import insert_scan_stream
+from brain_region_database.database.region_catalog import RegionCatalog
+from brain_region_database.scan import Point3D, Scan, ScanRegion
+from brain_region_database.scan_file import (
+    ScanFileError,
+    read_scan_file,
+    stream_scan,
+    write_scan_binary,
+    write_scan_json,
+)
+from brain_region_database.util import get_full_output_path, print_error_exit
+
+
+@dataclass
+class CohortJitter:
+    """
+    Standard deviations of the random perturbations applied to the template scans.
+    """
+
+    translation : float
+    scale       : float
+    region      : float
+    vertex      : float
+    intensity   : float
+
+
+def load_cohort_templates(paths: list[Path]) -> list[Scan]:
+    """
+    Load the template scans, merging the files of a same scan such as the files of its different levels of detail.
+    """
+
+    templates: dict[str, Scan] = {}
+    for path in paths:
+        print(f"Loading template '{path}'...")
+        try:
+            scan = read_scan_file(path)
+        except ScanFileError as error:
+            return print_error_exit(str(error))
+
+        template = templates.get(scan.file_name)
+        if template is None:
+            templates[scan.file_name] = scan
+        else:
+            template.regions.extend(scan.regions)
+
+    return list(templates.values())
+
+
+def generate_cohort_scan(template: Scan, index: int, jitter: CohortJitter, rng: np.random.Generator) -> Scan:
+    """
+    Generate a synthetic scan from a template scan. The scan is scaled around its center and translated as a whole,
+    then each region is translated slightly, its mesh vertices are jittered, and its intensities are multiplied by a
+    random gain. The perturbation of a region is the same at all its levels of detail.
+
+    The centroids and bounding boxes are in voxel coordinates while the meshes are in world coordinates, the voxel
+    axes are assumed to be aligned with the world axes to apply the same displacement to both.
+    """
+
+    voxel_size = parse_voxel_size(template.voxel_size)
+
+    scale          = max(0.5, 1 + rng.normal(0, jitter.scale))
+    translation    = rng.normal(0, jitter.translation, 3)
+    intensity_gain = max(0.0, 1 + rng.normal(0, jitter.intensity))
+
+    voxel_center, world_center = get_scan_centers(template)
+
+    region_offsets: dict[str, np.ndarray] = {}
+    region_gains:   dict[str, float] = {}
+
+    regions: list[ScanRegion] = []
+    for region in template.regions:
+        if region.name not in region_offsets:
+            region_offsets[region.name] = translation + rng.normal(0, jitter.region, 3)
+            region_gains[region.name]   = intensity_gain * max(0.0, 1 + rng.normal(0, jitter.intensity / 2))
+
+        offset = region_offsets[region.name]
+        gain   = region_gains[region.name]
+
+        vertices, faces = region.shape
+        world_vertices = world_center + scale * (vertices - world_center) + offset * voxel_size
+        if jitter.vertex > 0:
+            world_vertices += rng.normal(0, jitter.vertex, vertices.shape)
+
+        regions.append(region.model_copy(update={
+            'voxel_count': round(region.voxel_count * scale ** 3),
+            'mean_intensity': region.mean_intensity * gain,
+            'std_intensity': region.std_intensity * gain,
+            'min_intensity': region.min_intensity * gain,
+            'max_intensity': region.max_intensity * gain,
+            'median_intensity': region.median_intensity * gain,
+            'centroid': transform_point(region.centroid, voxel_center, scale, offset),
+            'bounding_box': (
+                transform_point(region.bounding_box[0], voxel_center, scale, offset),
+                transform_point(region.bounding_box[1], voxel_center, scale, offset),
+            ),
+            'shape': (world_vertices.astype(vertices.dtype), faces),
+        }))
+
+    return Scan(
+        file_name=f'synthetic_{index:06d}_{template.file_name}',
+        file_size=template.file_size,
+        dimensions=template.dimensions,
+        voxel_size=template.voxel_size,
+        regions=regions,
+    )
+
+
+def transform_point(point: Point3D, center: np.ndarray, scale: float, offset: np.ndarray) -> Point3D:
+    array = np.array([point.x, point.y, point.z])
+    return Point3D.from_array(center + scale * (array - center) + offset)
+
+
+def get_scan_centers(scan: Scan) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the center of a scan in voxel coordinates and in world coordinates, which are the means of the region centroids
+    and of the region mesh vertices.
+    """
+
+    if scan.regions == []:
+        return np.zeros(3), np.zeros(3)
+
+    centroids = [[region.centroid.x, region.centroid.y, region.centroid.z] for region in scan.regions]
+    voxel_center = np.mean(centroids, axis=0)
+
+    meshes_centers = [region.shape[0].mean(axis=0) for region in scan.regions if len(region.shape[0]) != 0]
+    world_center = np.mean(meshes_centers, axis=0) if meshes_centers != [] else np.zeros(3)
+
+    return voxel_center, world_center
+
+
+def parse_voxel_size(voxel_size: str) -> np.ndarray:
+    """
+    Parse a voxel size such as '1.00x1.00x1.00mm', defaulting to one millimeter if it cannot be parsed.
+    """
+
+    try:
+        sizes = np.array([float(size) for size in voxel_size.removesuffix('mm').split('x')])
+    except ValueError:
+        return np.ones(3)
+
+    return sizes if sizes.shape == (3,) else np.ones(3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='generate_cohort',
+        description=(
+            "Generate a synthetic cohort of scans by randomly perturbing template scans, to benchmark the database at"
+            " scale."
+        ),
+    )
+
+    parser.add_argument('templates',
+        type=Path,
+        nargs='+',
+        help=(
+            "JSON or binary template scan files. The files of a same scan, such as the files of its different levels of"
+            " detail, are merged into a single template."
+        ))
+
+    parser.add_argument('--count',
+        type=int,
+        required=True,
+        help="Number of scans to generate, the templates are used in turn.")
+
+    parser.add_argument('--seed',
+        type=int,
+        help="Seed of the random perturbations, which makes the cohort reproducible.")
+
+    parser.add_argument('--start',
+        type=int,
+        default=0,
+        help="Index of the first generated scan, which allows to extend an existing cohort with unique file names.")
+
+    output_group = parser.add_mutually_exclusive_group(required=True)
+
+    output_group.add_argument('--output',
+        type=Path,
+        help="Directory in which to write one scan file per generated scan.")
+
+    output_group.add_argument('--database',
+        action='store_true',
+        help="Insert the generated scans directly into the database.")
+
+    parser.add_argument('--format',
+        choices=['json', 'binary'],
+        default='json',
+        help="Format of the generated scan files.")
+
+    parser.add_argument('--adjacency',
+        action='store_true',
+        help="Precompute the region adjacency of the inserted scans.")
+
+    parser.add_argument('--translation-jitter',
+        type=float,
+        default=5.0,
+        help="Standard deviation in voxels of the translation of each scan.")
+
+    parser.add_argument('--scale-jitter',
+        type=float,
+        default=0.05,
+        help="Standard deviation of the relative scale of each scan.")
+
+    parser.add_argument('--region-jitter',
+        type=float,
+        default=1.0,
+        help="Standard deviation in voxels of the additional translation of each region.")
+
+    parser.add_argument('--vertex-jitter',
+        type=float,
+        default=0.2,
+        help="Standard deviation in millimeters of the displacement of each mesh vertex.")
+
+    parser.add_argument('--intensity-jitter',
+        type=float,
+        default=0.1,
+        help="Standard deviation of the relative intensity gain of each scan.")
+
+    args = parser.parse_args()
+
+    if args.count < 1:
+        return print_error_exit("The number of scans must be a positive number.")
+
+    if args.start < 0:
+        return print_error_exit("The index of the first scan must not be negative.")
+
+    if args.output is not None and not args.output.is_dir():
+        return print_error_exit(f"Output directory '{args.output}' not found.")
+
+    jitter = CohortJitter(
+        translation = args.translation_jitter,
+        scale       = args.scale_jitter,
+        region      = args.region_jitter,
+        vertex      = args.vertex_jitter,
+        intensity   = args.intensity_jitter,
+    )
+
+    templates = load_cohort_templates(args.templates)
+
+    if args.database:
+        db = get_engine_session()
+        catalog = RegionCatalog(db.get_bind())  # type: ignore
+
+    # Derive an independent seed for each scan, so that a scan only depends on the seed and its index.
+    seeds = np.random.SeedSequence(args.seed).spawn(args.start + args.count)[args.start:]
+
+    for index, seed in zip(range(args.start, args.start + args.count), seeds):
+        template = templates[index % len(templates)]
+        scan = generate_cohort_scan(template, index, jitter, np.random.default_rng(seed))
+
+        if args.database:
+            insert_scan_stream(db, stream_scan(scan), catalog, True, args.adjacency)  # type: ignore
+            continue
+
+        match args.format:
+            case 'json':
+                scan_path = get_full_output_path(args.output, f'{scan.file_name}.json')
+                with open(scan_path, 'w') as file:
+                    write_scan_json(scan, file)
+            case 'binary':
+                scan_path = get_full_output_path(args.output, f'{scan.file_name}.bin')
+                with open(scan_path, 'wb') as file:
+                    write_scan_binary(scan, file)
+
+        print(f"Generated '{scan_path}'.")
+
+
+if __name__ == '__main__':
+    main()
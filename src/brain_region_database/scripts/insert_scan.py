@@ -1,33 +1,16 @@
 #!/usr/bin/env python
 
 import argparse
-import json
-import sys
 from pathlib import Path
-from typing import TextIO
 
 from brain_region_database.database.engine import get_engine_session
-from brain_region_database.database.models import DBRegion, DBScanRegion
-from brain_region_database.database.queries import (
-    insert_region,
-    insert_scan,
-    insert_scan_region,
-    insert_scan_region_lod,
-    try_get_region,
-    try_get_scan,
-    try_get_scan_region,
-    try_get_scan_region_lod,
-)
-from brain_region_database.scan import Scan
+from brain_region_database.database.ingestion import DEFAULT_INSERT_BATCH_SIZE, insert_scan_stream
+from brain_region_database.database.region_catalog import RegionCatalog
+from brain_region_database.instrumentation import add_instrumentation_arguments, instrument_run
+from brain_region_database.scan_file import ScanFileError, stream_scan_file
 from brain_region_database.util import print_error_exit
 
 
-def read_scan_json(text: TextIO) -> Scan:
-    print("Loading scan data...")
-    scan_data = json.load(text)
-    return Scan(**scan_data)
-
-
 def main() -> None:
     parser = argparse.ArgumentParser(
         description='Insert a scan JSON into the database.'
@@ -36,67 +19,49 @@ def main() -> None:
     parser.add_argument(
         'file',
         type=Path,
-        help='JSON file containing the scan data. If not provided, read from the standard input.'
+        nargs='?',
+        help=(
+            'JSON or binary file containing the scan data. If not provided, read from the standard input, which can'
+            ' contain several newline-delimited JSON scans.'
+        )
+    )
+
+    parser.add_argument(
+        '--bulk',
+        action='store_true',
+        help='Insert the scan regions using a few multi-row inserts instead of one query per row.'
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_INSERT_BATCH_SIZE,
+        help='Number of scan regions read from the file before inserting them in the database.'
     )
 
+    parser.add_argument(
+        '--adjacency',
+        action='store_true',
+        help='Precompute the region adjacency of the inserted scan regions.'
+    )
+
+    add_instrumentation_arguments(parser)
+
     args = parser.parse_args()
 
-    if args.file:
-        if not args.file.exists():
-            print_error_exit(f"File '{args.file}' not found.")
-
-        with open(args.file) as file:
-            scan_data = read_scan_json(file)
-    else:
-        scan_data = read_scan_json(sys.stdin)
-
-    print(f"Loaded scan: {scan_data.file_name}")
-    print(f"Number of regions: {len(scan_data.regions)}")
-
-    db = get_engine_session()
-
-    scan = try_get_scan(db, scan_data.file_name)
-    if scan is not None:
-        print(f"Scan '{scan.file_name}' already present in the database.")
-    else:
-        print("Inserting scan into the database...")
-        scan = insert_scan(db, scan_data)
-        print(f"Successfully inserted scan with ID: {scan.id}")
-
-    regions: list[DBRegion] = []
-    for region_data in scan_data.regions:
-        region = try_get_region(db, region_data.name)
-        if region is not None:
-            print(f"Region '{region.name}' already present in the database.")
-        else:
-            print("Inserting scan region into the database...")
-            region = insert_region(db, region_data)
-            print(f"Successfully inserted region with ID: {region.id}")
-
-        regions.append(region)
-
-    scan_regions: list[DBScanRegion] = []
-    for region, region_data in zip(regions, scan_data.regions):
-        scan_region = try_get_scan_region(db, scan, region)
-        if scan_region is not None:
-            print(f"Region '{scan_region.region.name}' already present in the database for that scan.")
-        else:
-            print("Inserting scan region into the database...")
-            scan_region = insert_scan_region(db, scan, region, region_data)
-            print(f"Successfully inserted scan region with ID: {scan_region.id}")
-
-        scan_regions.append(scan_region)
-
-    for region, region_data in zip(regions, scan_data.regions):
-        lod = try_get_scan_region_lod(db, scan, region, region_data.lod_level)
-        if lod is not None:
-            print(f"Region LOD '{lod.region.name}' ('{lod.level}') already present in the database for that scan.")
-        else:
-            print("Inserting scan region LOD into the database...")
-            lod = insert_scan_region_lod(db, scan, region, region_data)
-            print(f"Successfully inserted scan region LOD with ID: {lod.id}")
-
-    db.commit()
+    if args.batch_size < 1:
+        print_error_exit("The batch size must be a positive number.")
+
+    with instrument_run(args):
+        db = get_engine_session()
+
+        catalog = RegionCatalog(db.get_bind())  # type: ignore
+
+        try:
+            for scan_stream in stream_scan_file(args.file):
+                insert_scan_stream(db, scan_stream, catalog, args.bulk, args.adjacency, args.batch_size)
+        except ScanFileError as error:
+            return print_error_exit(str(error))
 
 
 if __name__ == '__main__':
@@ -8,7 +8,7 @@ import nibabel as nib
 import numpy as np
 from nibabel.nifti1 import Nifti1Image
 
-from brain_region_database.nifti import ants_to_nib, load_nifti_image
+from brain_region_database.nifti import ants_to_nib, get_nifti_data, load_nifti_image
 from brain_region_database.process.orientation import reorient_nifti
 from brain_region_database.process.registration import register_nifti
 from brain_region_database.process.size import resize_nifti
@@ -51,6 +51,11 @@ def main() -> None:
         default='continuous',
         help="The interpolation to use in resampling.")
 
+    parser.add_argument('--workers',
+        type=int,
+        default=1,
+        help="Number of threads used to reorient the image.")
+
     parser.add_argument('--reference',
         type=Path,
         help="The reference NIfTI image against which to resize or reorient the image.")
@@ -62,6 +67,9 @@ def main() -> None:
 
     args = parser.parse_args()
 
+    if args.workers < 1:
+        return print_error_exit("The number of workers must be a positive number.")
+
     scan_path   = args.scan
     output_path = args.output
     scan_image = load_nifti_image(scan_path)
@@ -102,7 +110,7 @@ def main() -> None:
 
         print("Reorienting image...")
 
-        scan_image = reorient_nifti(scan_image, reference_image, args.interpolation)
+        scan_image = reorient_nifti(scan_image, reference_image, args.interpolation, args.workers)
 
     if args.resize:
         if reference_image is None:
@@ -113,12 +121,12 @@ def main() -> None:
         scan_image = resize_nifti(scan_image, reference_image, args.interpolation)
 
     if args.type:
-        current_type = scan_image.get_fdata().dtype
+        current_type = scan_image.get_data_dtype()  # type: ignore
         target_type = getattr(np, args.type)
 
         if current_type != target_type:
             print(f"Converting image from {current_type} to {args.type}...")
-            data = scan_image.get_fdata().astype(target_type)  # type: ignore
+            data = get_nifti_data(scan_image).astype(target_type)  # type: ignore
             scan_image = Nifti1Image(data, scan_image.affine, scan_image.header)  # type: ignore
             scan_image.header.set_data_dtype(target_type)  # type: ignore
         else:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+import argparse
+
+from brain_region_database.database.engine import get_engine_session
+from brain_region_database.database.region_query import (
+    DEFAULT_REGION_QUERY_BATCH_SIZE,
+    RegionQuery,
+    stream_region_query,
+)
+from brain_region_database.scan import Point3D
+from brain_region_database.util import print_error_exit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Query the regions of all the scans in the database that match the given predicates."
+    )
+
+    parser.add_argument('--scan',
+        action='append',
+        default=[],
+        help="File name of a scan whose regions to query, can be repeated. If not provided, all the scans are queried.")
+
+    parser.add_argument('--region',
+        action='append',
+        default=[],
+        help="Name of a region to query, can be repeated. If not provided, all the regions are queried.")
+
+    parser.add_argument('--laterality',
+        choices=['L', 'R'],
+        help="Laterality of the regions to query.")
+
+    parser.add_argument('--box',
+        type=float,
+        nargs=6,
+        metavar=('MIN_X', 'MIN_Y', 'MIN_Z', 'MAX_X', 'MAX_Y', 'MAX_Z'),
+        help="Box in voxel space in which the region centroids must be located.")
+
+    parser.add_argument('--sphere',
+        type=float,
+        nargs=4,
+        metavar=('X', 'Y', 'Z', 'RADIUS'),
+        help="Sphere in voxel space in which the region centroids must be located.")
+
+    parser.add_argument('--min-voxels',
+        type=int,
+        help="Minimum number of voxels of the regions.")
+
+    parser.add_argument('--max-voxels',
+        type=int,
+        help="Maximum number of voxels of the regions.")
+
+    parser.add_argument('--min-intensity',
+        type=float,
+        help="Minimum mean intensity of the regions.")
+
+    parser.add_argument('--max-intensity',
+        type=float,
+        help="Maximum mean intensity of the regions.")
+
+    parser.add_argument('--limit',
+        type=int,
+        help="Maximum number of regions to return.")
+
+    parser.add_argument('--after',
+        type=int,
+        help="Only return the regions whose scan region ID is greater than this one, used to query the next page.")
+
+    parser.add_argument('--batch-size',
+        type=int,
+        default=DEFAULT_REGION_QUERY_BATCH_SIZE,
+        help="Number of regions fetched from the database at once.")
+
+    args = parser.parse_args()
+
+    if args.limit is not None and args.limit < 1:
+        return print_error_exit("The limit must be a positive number.")
+
+    if args.batch_size < 1:
+        return print_error_exit("The batch size must be a positive number.")
+
+    query = RegionQuery(
+        scan_file_names=args.scan,
+        region_names=args.region,
+        laterality=args.laterality,
+        min_voxel_count=args.min_voxels,
+        max_voxel_count=args.max_voxels,
+        min_mean_intensity=args.min_intensity,
+        max_mean_intensity=args.max_intensity,
+    )
+
+    if args.box is not None:
+        min_x, min_y, min_z, max_x, max_y, max_z = args.box
+        query.box = (
+            Point3D(x=min(min_x, max_x), y=min(min_y, max_y), z=min(min_z, max_z)),
+            Point3D(x=max(min_x, max_x), y=max(min_y, max_y), z=max(min_z, max_z)),
+        )
+
+    if args.sphere is not None:
+        x, y, z, radius = args.sphere
+        query.sphere = (Point3D(x=x, y=y, z=z), radius)
+
+    db = get_engine_session()
+
+    count = 0
+    last_id = None
+    for result in stream_region_query(db, query, args.after, args.limit, args.batch_size):
+        centroid = result.centroid
+        print(
+            f"{result.scan_region_id}\t{result.scan_file_name}\t{result.region_name}\t{result.voxel_count}"
+            f"\t{result.mean_intensity:.2f}\t({centroid.x:.2f}, {centroid.y:.2f}, {centroid.z:.2f})"
+        )
+
+        count += 1
+        last_id = result.scan_region_id
+
+    print(f"Found {count} regions.")
+
+    if args.limit is not None and count == args.limit:
+        print(f"More regions may be available, use '--after {last_id}' to query the next page.")
+
+
+if __name__ == '__main__':
+    main()
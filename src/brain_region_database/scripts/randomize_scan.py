@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import nibabel as nib
@@ -9,105 +10,168 @@ from nibabel.nifti1 import Nifti1Image
 from scipy import ndimage  # type: ignore
 from scipy.ndimage import label  # type: ignore
 
-from brain_region_database.util import get_full_output_path
+from brain_region_database.nifti import get_nifti_data, load_nifti_image
+from brain_region_database.util import get_full_output_path, print_error_exit
 
+# Number of voxels deformed at once, which bounds the size of the displacement and coordinate arrays.
+DEFORMATION_SLAB_VOXELS = 1 << 21
 
-def elastic_deform_atlas(atlas_data: np.ndarray, alpha: float = 30, sigma: float = 5, order: float = 0):
+
+def elastic_deform_atlas(
+    atlas_data: np.ndarray,
+    alpha: float = 30,
+    sigma: float = 5,
+    order: int = 0,
+    grid_spacing: int = 1,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
     """
     Apply elastic deformation to atlas while preserving integer labels.
 
+    The displacement fields are generated on a control grid and interpolated to the voxels of the atlas, which is
+    deformed by slabs in single precision, so that no full-volume double precision array is ever allocated.
+
     Parameters:
     - atlas_data: 3D numpy array of integer labels
     - alpha: deformation intensity
     - sigma: smoothness of deformation
     - order: interpolation order (0 for nearest-neighbor for labels)
+    - grid_spacing: spacing in voxels of the control grid (1 to generate the displacement for every voxel)
+    - rng: random generator of the displacement fields
     """
 
-    shape = atlas_data.shape
-
-    # Create random displacement fields
-    dx = np.random.randn(*shape) * 2 - 1
-    dy = np.random.randn(*shape) * 2 - 1
-    dz = np.random.randn(*shape) * 2 - 1
-
-    # Smooth the displacement fields
-    dx = ndimage.gaussian_filter(dx, sigma, mode="constant") * alpha  # type: ignore
-    dy = ndimage.gaussian_filter(dy, sigma, mode="constant") * alpha  # type: ignore
-    dz = ndimage.gaussian_filter(dz, sigma, mode="constant") * alpha  # type: ignore
-
-    # Create coordinate grid
-    z, y, x = np.meshgrid(
-        np.arange(shape[0]),
-        np.arange(shape[1]),
-        np.arange(shape[2]),
-        indexing='ij',
-    )
+    if rng is None:
+        rng = np.random.default_rng()
 
-    # Apply displacement
-    indices = (z + dz, y + dy, x + dx)
-
-    # Use nearest-neighbor interpolation to preserve integer labels
-    deformed = ndimage.map_coordinates(atlas_data, indices, order=order, mode='nearest')
+    shape = atlas_data.shape
+    grid_shape = tuple(-(-(size - 1) // grid_spacing) + 1 for size in shape)
+
+    # Smoothing white noise on a coarser grid reduces its amplitude less, which is compensated for so that the
+    # deformation intensity does not depend on the grid spacing.
+    noise_scale = np.float32(2 / grid_spacing ** 1.5)
+
+    # Create random displacement fields on the control grid
+    displacements = [
+        ndimage.gaussian_filter(  # type: ignore
+            rng.standard_normal(grid_shape, dtype=np.float32) * noise_scale - 1,
+            sigma / grid_spacing,
+            mode='constant',
+        ) * np.float32(alpha)
+        for _ in range(3)
+    ]
+
+    deformed = np.empty(shape, dtype=atlas_data.dtype)
+
+    slab_size = max(1, DEFORMATION_SLAB_VOXELS // max(1, shape[1] * shape[2]))
+    for start in range(0, shape[0], slab_size):
+        end = min(start + slab_size, shape[0])
+        slab_shape = (end - start, shape[1], shape[2])
+
+        # Create coordinate grid of the slab
+        axes = np.ix_(
+            np.arange(start, end, dtype=np.float32),
+            np.arange(shape[1], dtype=np.float32),
+            np.arange(shape[2], dtype=np.float32),
+        )
+
+        # Apply displacement, interpolated from the control grid if needed
+        coordinates = np.empty((3, *slab_shape), dtype=np.float32)
+        if grid_spacing == 1:
+            for axis, (axis_coordinates, displacement) in enumerate(zip(axes, displacements)):
+                coordinates[axis] = axis_coordinates + displacement[start:end]
+        else:
+            grid_coordinates = np.empty((3, *slab_shape), dtype=np.float32)
+            for axis, axis_coordinates in enumerate(axes):
+                grid_coordinates[axis] = axis_coordinates / grid_spacing
+
+            for axis, (axis_coordinates, displacement) in enumerate(zip(axes, displacements)):
+                ndimage.map_coordinates(displacement, grid_coordinates, output=coordinates[axis], order=1)
+                coordinates[axis] += axis_coordinates
+
+        # Use nearest-neighbor interpolation to preserve integer labels
+        ndimage.map_coordinates(atlas_data, coordinates, output=deformed[start:end], order=order, mode='nearest')
 
     return deformed
 
 
 def postprocess_deformation(deformed_data: np.ndarray, original_data: np.ndarray) -> np.ndarray:
     """
-    Clean up holes and islands after deformation.
+    Clean up the islands after deformation, that is, the connected components of each label that are not the largest
+    component of that label. The voxels of all the islands are reassigned at once to the label of the nearest voxel
+    that is kept.
     """
 
     processed = deformed_data.copy()
-    labels = np.unique(original_data)
-
-    for lab in labels:
-        if lab == 0:
-            continue
+    original_labels = np.unique(original_data)
 
-        # Create mask for this label
-        mask = processed == lab
+    # Map the labels to consecutive indices, so that the bounding box of each label is found in a single pass.
+    values, indices = np.unique(processed, return_inverse=True)
+    indices = indices.reshape(processed.shape)
 
-        # Remove small islands (connected components)
-        labeled_mask, num_features = label(mask)  # type: ignore
+    islands = np.zeros(processed.shape, dtype=bool)
+    for index, slices in enumerate(ndimage.find_objects(indices + 1)):  # type: ignore
+        if slices is None or values[index] == 0 or values[index] not in original_labels:
+            continue
 
+        # Label the connected components of the label in its bounding box only.
+        labeled_mask, num_features = label(indices[slices] == index)  # type: ignore
         if num_features > 1:
-            # Find size of each component
             component_sizes = np.bincount(labeled_mask.ravel())  # type: ignore
-
-            # Keep only largest component
             largest_component = np.argmax(component_sizes[1:]) + 1
+            islands[slices] |= (labeled_mask != 0) & (labeled_mask != largest_component)
+
+    kept = (processed != 0) & ~islands
+    if not islands.any() or not kept.any():
+        return processed
+
+    # Find the nearest kept voxel of every voxel and copy its label to the islands.
+    nearest_indices = ndimage.distance_transform_edt(~kept, return_distances=False, return_indices=True)  # type: ignore
+    processed[islands] = processed[tuple(axis_indices[islands] for axis_indices in nearest_indices)]  # type: ignore
 
-            # Remove small islands
-            for comp_id in range(1, num_features + 1):  # type: ignore
-                if comp_id != largest_component:
-                    # Assign these voxels to nearest neighbor label
-                    component_mask = labeled_mask == comp_id  # type: ignore
+    return processed
 
-                    # Get coordinates of voxels to reassign
-                    coords = np.argwhere(component_mask)  # type: ignore
 
-                    for coord in coords:
-                        # Look in immediate neighborhood
-                        z, y, x = coord
-                        z_slice = slice(max(0, z - 2), min(processed.shape[0], z + 3))
-                        y_slice = slice(max(0, y - 2), min(processed.shape[1], y + 3))
-                        x_slice = slice(max(0, x - 2), min(processed.shape[2], x + 3))
+def randomize_atlas(
+    atlas_path: Path,
+    output_path: Path,
+    alpha: float,
+    sigma: float,
+    grid_spacing: int,
+    seed: np.random.SeedSequence,
+) -> Path:
+    """
+    Write a randomly deformed version of an atlas. The atlas is read in each call so that this function can run in a
+    worker process without transferring the atlas data.
+    """
 
-                        neighborhood = processed[z_slice, y_slice, x_slice]
-                        neighbor_labels = neighborhood[neighborhood != 0]
+    atlas = load_nifti_image(atlas_path)
+    atlas_data = get_nifti_data(atlas)
 
-                        if len(neighbor_labels) > 0:
-                            # Assign to most common neighbor
-                            unique, counts = np.unique(neighbor_labels, return_counts=True)
-                            processed[coord[0], coord[1], coord[2]] = unique[np.argmax(counts)]
+    rng = np.random.default_rng(seed)
+    warped_data = elastic_deform_atlas(atlas_data, alpha=alpha, sigma=sigma, grid_spacing=grid_spacing, rng=rng)
+    warped_data = postprocess_deformation(warped_data, atlas_data)
 
-    return processed
+    warped_image = Nifti1Image(warped_data, atlas.affine, atlas.header)  # type: ignore
+    nib.save(warped_image, output_path)  # type: ignore
+    return output_path
+
+
+def get_randomized_name(name: str, index: int) -> str:
+    """
+    Get the file name of a randomized atlas, which is the original file name suffixed with the atlas index.
+    """
+
+    for extension in ('.nii.gz', '.nii'):
+        if name.endswith(extension):
+            return f'{name.removesuffix(extension)}_{index}{extension}'
+
+    return f'{name}_{index}'
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        prog='patch_scan',
-        description="Resize or change the data type of a NIfTI image.",
+        prog='randomize_scan',
+        description="Generate randomly deformed versions of an atlas NIfTI image.",
     )
 
     parser.add_argument('scan',
@@ -119,6 +183,28 @@ def main() -> None:
         default='continuous',
         help="The interpolation to use in resampling.")
 
+    parser.add_argument('--count',
+        type=int,
+        default=1,
+        help="Number of deformed atlases to generate, the output must be a directory if it is greater than one.")
+
+    parser.add_argument('--seed',
+        type=int,
+        help="Seed of the random deformations, which makes the output reproducible.")
+
+    parser.add_argument('--grid-spacing',
+        type=int,
+        default=1,
+        help=(
+            "Spacing in voxels of the grid on which the random displacements are generated. Larger values use less"
+            " memory."
+        ))
+
+    parser.add_argument('--workers',
+        type=int,
+        default=1,
+        help="Number of atlases generated concurrently in separate processes.")
+
     parser.add_argument('--output',
         required=True,
         type=Path,
@@ -129,17 +215,43 @@ def main() -> None:
     scan_path:   Path = args.scan
     output_path: Path = args.output
 
-    # Load atlas
-    scan = nib.load(args.scan)  # type: ignore
-    scan_data = scan.get_fdata()  # type: ignore
+    if args.count < 1:
+        return print_error_exit("The number of atlases must be a positive number.")
+
+    if args.grid_spacing < 1:
+        return print_error_exit("The grid spacing must be a positive number.")
+
+    if args.workers < 1:
+        return print_error_exit("The number of workers must be a positive number.")
+
+    if args.count > 1 and not output_path.is_dir():
+        return print_error_exit("The output must be a directory to generate several atlases.")
+
+    if args.count == 1:
+        output_paths = [get_full_output_path(output_path, scan_path.name)]
+    else:
+        output_paths = [
+            get_full_output_path(output_path, get_randomized_name(scan_path.name, i)) for i in range(args.count)
+        ]
+
+    # Derive an independent seed for each atlas, so that the output does not depend on the number of workers.
+    seeds = np.random.SeedSequence(args.seed).spawn(args.count)
+
+    if args.workers == 1:
+        for atlas_output_path, seed in zip(output_paths, seeds):
+            randomize_atlas(scan_path, atlas_output_path, 20, 3, args.grid_spacing, seed)
+            print(f"Generated '{atlas_output_path}'.")
 
-    warped_data = elastic_deform_atlas(scan_data, alpha=20, sigma=3)  # type: ignore
-    warped_data = postprocess_deformation(warped_data, scan_data)  # type: ignore
+        return
 
-    scan_image = Nifti1Image(warped_data, scan.affine, scan.header)  # type: ignore
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(randomize_atlas, scan_path, atlas_output_path, 20, 3, args.grid_spacing, seed)
+            for atlas_output_path, seed in zip(output_paths, seeds)
+        ]
 
-    full_output_path = get_full_output_path(output_path, scan_path.name)
-    nib.save(scan_image, full_output_path)  # type: ignore
+        for future in as_completed(futures):
+            print(f"Generated '{future.result()}'.")
 
 
 if __name__ == '__main__':
@@ -1,17 +1,14 @@
 #!/usr/bin/env python
 
 import argparse
-import re
 
 import numpy as np
 import pyvista as pv
-from geoalchemy2.functions import ST_AsText
-from sqlalchemy import select
 from sqlalchemy.orm import Session as Database
 
 from brain_region_database.database.engine import get_engine_session
-from brain_region_database.database.models import DBRegion, DBScanRegionLOD
-from brain_region_database.database.queries import try_get_scan
+from brain_region_database.database.geometries import read_postgis_3d_geometry_wkb
+from brain_region_database.database.queries import get_scan_region_lod_shapes_wkb, try_get_scan
 from brain_region_database.util import generate_random_colors, print_error_exit
 
 
@@ -20,11 +17,7 @@ def visualize_database_regions(db: Database, file_name: str, lod_level: int | No
     if scan is None:
         return print_error_exit(f"No scan type with file name '{file_name}' found.")
 
-    results: list[str] = list(db.execute(select(DBRegion.name, ST_AsText(DBScanRegionLOD.shape))  # type: ignore
-        .join(DBScanRegionLOD.region)
-        .where(DBScanRegionLOD.scan == scan)
-        .where(DBScanRegionLOD.level == lod_level)
-    ).all())
+    results = get_scan_region_lod_shapes_wkb(db, scan, lod_level)
 
     if results == []:
         return print_error_exit(f"No regions found for scan '{scan.file_name}' and LOD level {lod_level}.")
@@ -33,7 +26,7 @@ def visualize_database_regions(db: Database, file_name: str, lod_level: int | No
 
     # Convert to PyVista mesh
     plotter = pv.Plotter()
-    for (name, surface), color in zip(results, colors):
+    for (_, name, surface), color in zip(results, colors):
         mesh = polyhedral_to_pyvista_mesh(surface)
         plotter.add_mesh(mesh, label=name, color=color)  # type: ignore
 
@@ -47,52 +40,19 @@ def visualize_database_regions(db: Database, file_name: str, lod_level: int | No
     plotter.show()  # type: ignore
 
 
-def polyhedral_to_pyvista_mesh(surface_string: str) -> pv.PolyData:
+def polyhedral_to_pyvista_mesh(surface_wkb: bytes | memoryview) -> pv.PolyData:
     """
-    Convert a PolyhedralSurfaceZ string to a PyVista mesh.
+    Convert a PolyhedralSurfaceZ WKB to a PyVista mesh.
     """
 
-    # Find all polygons.
-    polygon_pattern = r'\(\(\((.*?)\)\)\)'
-    polygon_matches = re.findall(polygon_pattern, surface_string, re.DOTALL)
-    if polygon_matches == []:
-        return print_error_exit("No polygons found in polyhedral string.")
-
-    vertices = []
-    faces = []
-    vertex_offset = 0
-
-    for polygon_string in polygon_matches:
-        # Parse the coordinates of this polygon.
-        polygon_coords: list[tuple[float, float, float]] = []
-        for coords_match in re.finditer(r'(-?\d+\.?\d*)\s+(-?\d+\.?\d*)\s+(-?\d+\.?\d*)', polygon_string):
-            x, y, z = map(float, coords_match.groups())
-            polygon_coords.append((x, y, z))  # type: ignore
-
-        # For PyVista, we need to create triangular faces
-        # Each polygon with n vertices becomes (n-2) triangles
-
-        # Add vertices to global list
-        vertices.extend(polygon_coords)  # type: ignore
-
-        # Create triangles using fan triangulation
-        n = len(polygon_coords)
-        for i in range(1, n - 1):
-            # PyVista format: [n, v1, v2, v3, ...] where n=3 for triangle
-            faces.extend((  # type: ignore
-                3,
-                vertex_offset,
-                vertex_offset + i,
-                vertex_offset + i + 1,
-            ))
-
-        vertex_offset += n
-
-    # Convert to numpy arrays
-    vertices_array = np.array(vertices)  # type: ignore
-    faces_array = np.array(faces, dtype=np.int32)
-
-    return pv.PolyData(vertices_array, faces_array)
+    vertices, faces = read_postgis_3d_geometry_wkb(surface_wkb)
+    if len(faces) == 0:
+        return print_error_exit("No polygons found in polyhedral surface.")
+
+    # PyVista format: [n, v1, v2, v3, ...] where n=3 for triangle
+    faces_array = np.hstack([np.full((len(faces), 1), 3), faces]).astype(np.int32).ravel()
+
+    return pv.PolyData(vertices, faces_array)
 
 
 def main() -> None: